@@ -23,6 +23,18 @@ import queue, threading, time
 import sys
 import pyttsx3
 import importlib
+import functools
+import itertools
+import collections
+import string
+import unicodedata
+import json
+import hashlib
+import pickle
+import zlib
+import mmap
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor
 
 # Platform-specific imports
 if os.name == "nt":  # Windows
@@ -36,6 +48,7 @@ from pynput import keyboard
 # Spellcheckers
 from spellchecker import SpellChecker
 from rapidfuzz import process
+from rapidfuzz.distance import DamerauLevenshtein, JaroWinkler
 
 from colorama import init as colorama_init, Fore, Style
 colorama_init()
@@ -107,102 +120,97 @@ def colored_input(prompt, first_char=None, color=Fore.GREEN):
     return "".join(buf)
 
 # ---------------------------------------------------------
-# Language detection helpers and keyword sets
+# Unicode folding (one table for detection, vocab and rule matching)
 # ---------------------------------------------------------
-SWEDISH_RECOGNITION_WORDS = [
-    # Pronouns
-    "jag", "du", "ni", "vi", "han", "hon", "den", "det", "de", "dom",
-    "mig", "dig", "honom", "henne", "oss", "man", "min", "mitt", "mina",
-    "din", "ditt", "dina", "sin", "sitt", "sina", "hans", "hennes", "deras",
-
-    # Question words
-    "vad", "vem", "vilken", "vilket", "vilka", "hur", "nar", "var", "vart",
-
-    # Common verbs
-    "ar", "var", "blir", "blev", "finns", "fanns", "gora", "gjorde", "gor",
-    "kommer", "kom", "sager", "sa", "tycker", "tyckte", "tror", "trodde",
-    "vill", "ville", "kan", "kunde", "maste", "skulle", "ska", "bor", "borde",
-    "far", "fick", "ger", "gav", "tar", "tog", "ser", "sag", "vet", "visste",
-    "kanner", "kande", "borjar", "borjade", "slutar", "slutade",
-
-    # Adverbs / Particles
-    "inte", "ja", "nej", "kanske", "redan", "aldrig", "alltid", "ofta", "sallan",
-    "snart", "nyss", "igen", "hittills", "dessutom", "fast", "dock",
-    "ju", "val", "nog", "bara",
-
-    # Conjunctions
-    "men", "eller", "utan", "eftersom", "innan", "efter", "sa", "for", "medan", "om", "och", "att",
-
-    # Everyday nouns
-    "dag", "natt", "morgon", "kvall", "timme", "minut", "sekund",
-    "vecka", "manad", "liv", "tid", "framtid",
-    "hem", "hus", "rum", "dorr", "fonster", "golv", "tak",
-    "skola", "arbete", "jobb", "pengar", "bil", "cykel", "tag", "buss",
-    "barn", "vuxen", "kvinna", "man", "kompis", "van",
-
-    # Food & basics
-    "mat", "vatten", "mjolk", "kaffe", "te", "brod", "ost", "socker", "salt",
-
-    # Places
-    "sverige", "svensk", "stockholm", "malmo", "goteborg"
-]
-
-ENGLISH_RECOGNITION_WORDS = [
-    # Pronouns
-    "i", "you", "he", "she", "it", "we", "they", "me", "him", "her", "us", "them",
-    "my", "your", "his", "its", "our", "their", "mine", "yours", "ours", "theirs",
-
-    # Question words
-    "what", "who", "which", "when", "where", "why", "how",
-
-    # Common verbs
-    "be", "am", "is", "are", "was", "were", "being", "been",
-    "have", "has", "had", "do", "does", "did", "done",
-    "can", "could", "will", "would", "shall", "should", "may", "might", "must",
-    "go", "went", "gone", "get", "got", "make", "made", "say", "said",
-    "see", "saw", "know", "knew", "think", "thought", "want", "wanted",
-
-    # Adverbs / Particles
-    "not", "yes", "no", "maybe", "always", "never", "often", "sometimes",
-    "soon", "again", "just", "already", "still",
-
-    # Conjunctions
-    "and", "or", "but", "because", "if", "while", "though", "although", "since", "until", "so", "than",
-
-    # Everyday nouns
-    "day", "night", "morning", "evening", "time", "year", "month", "week",
-    "man", "woman", "child", "friend", "people", "house", "home", "room",
-    "school", "work", "job", "money", "car", "bus", "train", "food", "water",
-
-    # Food & basics
-    "bread", "milk", "coffee", "tea", "sugar", "salt",
-
-    # Places
-    "england", "english", "london", "america", "american", "new", "york"
-]
-
-# Exit words (either English or Swedish triggers exit)
-GOODBYES_EN = {
-    "quit", "bye", "goodbye", "good bye", "bye bye",
-    "see you", "see ya", "later", "cya", "catch you later",
-    "take care", "farewell", "so long", "exit", "end"
-}
-
-GOODBYES_SV = {
-    "slut", "hejdå", "hej då", "adjö", "adjöss",
-    "vi ses", "ses", "på återseende", "ta hand om dig",
-    "ha det", "ha det bra", "sköt om dig", "farväl", "slut på samtal"
-}
-
-QUIT_WORDS = GOODBYES_EN | GOODBYES_SV
+def _build_fold_table():
+    """Map accented Latin letters to their ASCII base letter, one character for one."""
+    table = {}
+    for cp in itertools.chain(range(0xC0, 0x250), range(0x1E00, 0x1F00)):
+        base = unicodedata.normalize("NFKD", chr(cp))[0]
+        if base != chr(cp) and base.isascii() and base.isalpha():
+            table[cp] = base
+    # letters without a decomposition; still one-for-one so offsets carry over
+    table.update(str.maketrans("æÆøØßłŁđĐœŒ", "aAoOslLdDoO"))
+    return table
+
+# "jag är trött" -> "jag ar trott" (same length, so offsets carry over)
+FOLD_TABLE = _build_fold_table()
+
+def fold(text):
+    """ASCII-fold accented letters (keeps case and length)."""
+    return text if text.isascii() else text.translate(FOLD_TABLE)
 
-EN_FILLERS = [
-    "uh", "um", "hmm", "like", "well"
-    ]
+# ---------------------------------------------------------
+# Language packs (languages/<code>/pack.json, loaded on first use)
+# ---------------------------------------------------------
+LANGUAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "languages")
+DEFAULT_LANGUAGE = "en"
 
-SV_FILLERS = [
-    "eh", "asså", "hmm", "liksom", "typ"
-    ]
+class LanguagePack:
+    """
+    One language's profile from its pack.json: recognition, fillers, goodbyes, voices, spell settings.
+    The heavy parts (rules, trigram model, spell dictionary) load on first use.
+    """
+    REQUIRED = ("bcp47", "recognition_words", "fillers", "goodbyes", "farewells")
+
+    def __init__(self, code, data, source="<pack>"):
+        missing = [key for key in self.REQUIRED if not data.get(key)]
+        if missing:
+            raise ValueError(f"{source}: missing {', '.join(missing)}")
+        self.code = code
+        self.name = data.get("name", code)
+        self.bcp47 = data["bcp47"]
+        self.letters = frozenset(data.get("letters", ""))  # letters only this language uses
+        self.recognition = frozenset(fold(w.casefold()) for w in data["recognition_words"])
+        self.switch_phrases = tuple(p.lower() for p in data.get("switch_phrases", ()))
+        self.fillers = tuple(data["fillers"])
+        self.conjunctions = tuple(data.get("conjunctions", ()))  # where a filler may go mid-sentence
+        # (probability, ((regex, replacement), ...), count) per casual quirk humanize_text may apply
+        self.style_quirks = tuple((q["prob"], tuple((re.compile(p), r) for p, r in q["replace"]), q.get("count", 0))
+                                  for q in data.get("style_quirks", ()))
+        goodbyes = {fold(p.lower()) for p in data["goodbyes"]}
+        self.goodbye_words = frozenset(p for p in goodbyes if " " not in p)
+        self.goodbye_phrases = tuple(sorted(p for p in goodbyes if " " in p))
+        self.farewells = tuple(data["farewells"])
+        self.tts_voice = data.get("tts_voice")  # preferred voice name substring
+        self.tts_hints = tuple(h.lower() for h in data.get("tts_hints", (code,)))
+        self.spell = MappingProxyType(dict(data.get("spell") or {}))
+
+    def resource_path(self, name):
+        """Path of a file shipped with this pack."""
+        return os.path.join(LANGUAGES_DIR, self.code, name)
+
+    @property
+    def rules(self):
+        return rules_for(self.code)
+
+_PACKS = {}
+_PACKS_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
+def available_languages():
+    """Codes of the installed language packs, default language first (reads no pack)."""
+    try:
+        codes = [code for code in sorted(os.listdir(LANGUAGES_DIR))
+                 if os.path.isfile(os.path.join(LANGUAGES_DIR, code, "pack.json"))]
+    except OSError:
+        codes = []
+    return tuple(sorted(codes, key=lambda code: code != DEFAULT_LANGUAGE))
+
+def language_pack(code):
+    """Return the LanguagePack for a code, loading it on first use (default language for unknown codes)."""
+    pack = _PACKS.get(code)
+    if pack is not None:
+        return pack
+    if code not in available_languages():
+        code = DEFAULT_LANGUAGE
+    with _PACKS_LOCK:
+        pack = _PACKS.get(code)
+        if pack is None:
+            path = os.path.join(LANGUAGES_DIR, code, "pack.json")
+            with open(path, encoding="utf-8") as f:
+                pack = _PACKS[code] = LanguagePack(code, json.load(f), path)
+    return pack
 
 QWERTY_NEIGHBORS = {
     "a":"sqwz", "b":"vghn", "c":"xdfv", "d":"ersfcx", "e":"wrsd",
@@ -212,128 +220,582 @@ QWERTY_NEIGHBORS = {
     "w":"qes", "x":"zsdc", "y":"tugh", "z":"xs", "'":"", "-":""
 }
 
-# Fun exit phrases
-FAREWELLS_EN = [
-    "Logging off like a true 90s modem… goodbye!",
-    "May the Wi-Fi be with you!",
-    "See you in another timeline!",
-    "Vanishing dramatically… poof!",
-    "Ctrl + Alt + Bye!",
-    "Powering down human interface…",
-    "Closing all tabs, including this one!",
-    "Teleporting to another chat dimension…",
-    "Unsubscribing from reality for today!",
-    "Alt+F4’ing out of existence…"
-]
-
-FAREWELLS_SV = [
-    "Loggar ut som ett gammalt ICQ-konto… hej då!",
-    "Må Wi-fi:et vara med dig!",
-    "Vi ses i nästa liv!",
-    "Försvinner mystiskt i dimman… poff!",
-    "Ctrl + Alt + Hej då!",
-    "Stänger alla flikar, även denna!",
-    "Loggar ut ur verkligheten för idag!",
-    "Alt+F4:ar mig bort från samtalet…",
-    "Teleporteras till en annan dimension!",
-]
-
-
-# Try to load a user-maintained Swedish wordlist if present
-def _load_swedish_vocab():
-    core = {
-        # very common function words + forms (kept small; add more in file)
-        "jag","du","han","hon","vi","ni","de","dom","mig","dig","oss","er",
-        "min","mitt","mina","din","ditt","dina","sin","sitt","sina","hans","hennes","deras",
-        "inte","ja","nej","kanske","och","att","men","eller","utan","eftersom","innan","efter","om","för","så",
-        "är","var","bli","blir","blev","finns","gör","gjorde","kommer","kom","säger","sa",
-        "kan","kunde","vill","ville","måste","ska","skulle","bör","borde","får","fick","tar","tog","ser","såg","vet","visste",
-        "hej","tack","snälla","alltid","aldrig","ofta","sällan","snart","igen","redan",
-        "dag","natt","morgon","kväll","vecka","månad","år","tid","framtid","hem","hus","rum","dörr","fönster",
-        "skola","arbete","jobb","pengar","bil","tåg","buss",
-        "barn","vuxen","kvinna","man","kompis","vän",
-        "mat","vatten","mjölk","kaffe","te","bröd","ost","socker","salt",
-        "sverige","svensk","stockholm","göteborg","malmö",
-        # common adjectives/feelings
-        "trött","ledsen","glad","orolig","arg","rädd","stressad","lugnt","svårt","lätt",
-    }
-
-    # If file exists, merge its lines
-    path = os.path.join(os.path.dirname(__file__), "swedish_words.txt")
-    if os.path.isfile(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                file_words = {w.strip().lower() for w in f if w.strip()}
-                core |= file_words
-        except Exception:
-            pass
-    return core
+CacheInfo = collections.namedtuple("CacheInfo", "hits misses maxsize currsize")
+_MISSING = object()
 
-SWEDISH_VOCAB = _load_swedish_vocab()
+class SpellCache:
+    """Thread-safe LRU map of (language, token) -> correction; maxsize=None is unbounded, 0 disables it."""
 
-def correct_word_sv(word, threshold=88):
-    # skip very short or non-alpha
-    w = word.strip()
-    if len(w) < 3 or not any(ch.isalpha() for ch in w):
-        return word
-    # if already in vocab, keep
-    if w in SWEDISH_VOCAB:
-        return word
-    # candidate from vocab
-    match = process.extractOne(w, SWEDISH_VOCAB)
-    if not match:
-        return word
-    cand, score, _ = match
-    # only replace if very similar and different
-    return cand if score >= threshold and cand != w else word
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
 
-def correct_swedish_text(text):
-    # keep punctuation spacing; operate per token
-    tokens = re.findall(r"\w+|[^\w\s]", text, flags=re.UNICODE)
-    out = []
-    for t in tokens:
-        if re.match(r"^\w+$", t, flags=re.UNICODE):
-            out.append(correct_word_sv(t.lower()))
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def info(self):
+        """Hit/miss statistics, shaped like functools.lru_cache's cache_info()."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+def configure_spell_cache(maxsize=65536):
+    """(Re)create the process-wide spelling correction cache (see SpellCache)."""
+    global _spell_cache
+    _spell_cache = SpellCache(maxsize)
+    return _spell_cache
+
+configure_spell_cache()
+
+def spell_cache_info():
+    """Hit/miss statistics of the spelling correction cache, for sizing it."""
+    return _spell_cache.info()
+
+def cached_correction(language, token, correct):
+    """correct(token), looked up in / stored to the spelling correction cache."""
+    key = (language, token)
+    fix = _spell_cache.get(key, _MISSING)
+    if fix is _MISSING:
+        fix = correct(token)
+        _spell_cache.put(key, fix)
+    return fix
+
+def cached_corrections(language, tokens, correct_all):
+    """{token: fix} like cached_correction, with the cache misses passed to correct_all(tokens) together."""
+    fixes, todo = {}, []
+    for token in tokens:
+        fix = _spell_cache.get((language, token), _MISSING)
+        if fix is _MISSING:
+            todo.append(token)
         else:
-            out.append(t)
-    return "".join([
-        # reinsert a space if joining two alnum tokens without punctuation
-        ((" " if i and out[i-1].isalnum() and tok.isalnum() else "") + tok)
-        for i, tok in enumerate(out)
-    ])
+            fixes[token] = fix
+    if todo:
+        fresh = correct_all(todo)
+        for token in todo:
+            _spell_cache.put((language, token), fresh[token])
+            fixes[token] = fresh[token]
+    return fixes
+
+_SPELL_LOAD_LOCK = threading.RLock()
+
+def _spell_loader(load):
+    """functools.lru_cache for a spell resource loader, run by one thread at a time (see warm_language)."""
+    cached = functools.lru_cache(maxsize=None)(load)
+
+    @functools.wraps(load)
+    def loader():
+        with _SPELL_LOAD_LOCK:
+            return cached()
+    loader.cache_clear = cached.cache_clear
+    return loader
+
+def _write_atomic(path, write, stale=None):
+    """
+    write(f) to a temp file that then replaces path, so readers never see half a file.
+    Afterwards the other files in its directory for which stale(name) is true are removed.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    if stale is not None:
+        for old in os.listdir(directory):
+            if old != os.path.basename(path) and stale(old):
+                os.remove(os.path.join(directory, old))
+
+_WORD_TABLE_MAGIC = b"ELZWORD1"
+
+def write_word_table(words, path):
+    """
+    Save a sorted list of distinct words as a WordTable file: magic, word
+    count, uint64 byte offsets (count + 1), uint16 lengths, UTF-8 bytes.
+    """
+    encoded = [w.encode("utf-8") for w in words]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    lengths = np.array([len(w) for w in words], dtype=np.uint16)
+    _write_atomic(path, lambda f: f.writelines([_WORD_TABLE_MAGIC, np.uint64(len(encoded)).tobytes(),
+                                                offsets.tobytes(), lengths.tobytes(), b"".join(encoded)]))
+
+class WordTable:
+    """Sorted word list memory-mapped from a write_word_table file: len(), iteration, table[i], `in`, prefix()."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:8] != _WORD_TABLE_MAGIC:
+            raise ValueError(f"{path} is not a compiled word table")
+        count = int(np.frombuffer(self._map, np.uint64, 1, 8)[0])
+        self.offsets = np.frombuffer(self._map, np.uint64, count + 1, 16)
+        self.lengths = np.frombuffer(self._map, np.uint16, count, 16 + 8 * (count + 1))
+        self._blob = 16 + 8 * (count + 1) + 2 * count
+        if len(self._map) != self._blob + int(self.offsets[-1]):
+            raise ValueError(f"{path} is truncated")
+        self.path = path
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def _key(self, i):
+        return self._map[self._blob + int(self.offsets[i]):self._blob + int(self.offsets[i + 1])]
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return self._key(i % len(self)).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def take(self, ids):
+        """The words at an array of indices, as a list."""
+        ids = np.asarray(ids, dtype=np.intp)
+        starts = (self.offsets[ids] + self._blob).tolist()
+        ends = (self.offsets[ids + 1] + self._blob).tolist()
+        return [self._map[a:b].decode("utf-8") for a, b in zip(starts, ends)]
+
+    def digest(self):
+        """sha256 of the table file, read from the mapping (no per-word objects)."""
+        return hashlib.sha256(self._map).digest()
+
+    def _bisect(self, key):
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __contains__(self, word):
+        key = word.encode("utf-8")
+        i = self._bisect(key)
+        return i < len(self) and self._key(i) == key
+
+    def prefix(self, prefix):
+        """The words starting with prefix, in order."""
+        key = prefix.encode("utf-8")
+        # no UTF-8 byte is 0xff, so key + b"\xff" sorts after every word starting with key
+        return [self[i] for i in range(self._bisect(key), self._bisect(key + b"\xff"))]
+
+def compile_wordlist(path, out_dir=None, extra_words=()):
+    """
+    Compile a one-word-per-line file (plus extra_words) into WordTables in out_dir.
+    Returns the paths of <name>.bin (the words) and <name>.folded.bin (their folded forms).
+    """
+    out_dir = out_dir or os.path.join(os.path.dirname(path), "__pycache__")
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(path, encoding="utf-8") as f:
+        words = sorted({w.strip().lower() for w in itertools.chain(f, extra_words) if w.strip()})
+    os.makedirs(out_dir, exist_ok=True)
+    tables = os.path.join(out_dir, name + ".bin"), os.path.join(out_dir, name + ".folded.bin")
+    write_word_table(words, tables[0])
+    write_word_table(sorted({fold(w) for w in words}), tables[1])
+    return tables
+
+class Vocabulary:
+    """A small in-memory word set and an optional WordTable, read as one set."""
+
+    def __init__(self, core, table=None):
+        self.table = table
+        self.core = frozenset(w for w in core if table is None or w not in table)
+
+    def __contains__(self, word):
+        return word in self.core or (self.table is not None and word in self.table)
+
+    def __len__(self):
+        return len(self.core) + (len(self.table) if self.table is not None else 0)
+
+    def __iter__(self):
+        yield from self.core
+        if self.table is not None:
+            yield from self.table
+
+@_spell_loader
+def swedish_wordlist():
+    """
+    The Swedish wordlist plus core words as (words, folded) WordTables, or (None, None) without one.
+    Recompiled whenever swedish_words.txt or pack.json is newer than the tables.
+    """
+    pack = language_pack("sv")
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), pack.spell.get("wordlist", "swedish_words.txt"))
+    name = os.path.splitext(os.path.basename(path))[0]
+    cache_dir = os.path.join(os.path.dirname(path), "__pycache__")
+    tables = os.path.join(cache_dir, name + ".bin"), os.path.join(cache_dir, name + ".folded.bin")
+    try:
+        if os.path.isfile(path):
+            newest = max(os.path.getmtime(path), os.path.getmtime(pack.resource_path("pack.json")))
+            if not all(os.path.isfile(t) and os.path.getmtime(t) >= newest for t in tables):
+                print(f"(compiling {os.path.basename(path)} into {cache_dir})")
+                compile_wordlist(path, cache_dir, pack.spell.get("core_words", ()))
+        if not all(os.path.isfile(t) for t in tables):
+            return None, None
+        return WordTable(tables[0]), WordTable(tables[1])
+    except (OSError, ValueError) as e:
+        print(f"(Swedish wordlist not used: {e})")
+        return None, None
+
+@_spell_loader
+def swedish_vocab():
+    """Swedish spelling vocabulary: the pack's core words plus the compiled wordlist, if any."""
+    return Vocabulary(language_pack("sv").spell.get("core_words", ()), swedish_wordlist()[0])
+
+@_spell_loader
+def swedish_vocab_folded():
+    """The Swedish vocabulary by folded form, so "tradgard" is known like "trädgård"."""
+    return Vocabulary({fold(w) for w in language_pack("sv").spell.get("core_words", ())}, swedish_wordlist()[1])
+
+@_spell_loader
+def swedish_symspell():
+    """SymSpell index over the Swedish vocabulary (over the mapped word table when there is one)."""
+    vocab = swedish_vocab()
+    return SymSpell(vocab.table if vocab.table is not None else dict.fromkeys(vocab.core, 1),
+                    cache_dir=os.path.join(LANGUAGES_DIR, "sv", "__pycache__"))
+
+SV_SPELL_THRESHOLD = 88  # Jaro-Winkler similarity (0-100) a Swedish correction needs
+
+def correct_words_sv(words, threshold=SV_SPELL_THRESHOLD, chunksize=1024):
+    """
+    {word: correction} for the misspelled ones among words (any iterable), corrected in one batch.
+    A correction is the Jaro-Winkler best within two edits, used if it reaches threshold (0-100).
+    """
+    vocab, folded = swedish_vocab(), swedish_vocab_folded()
+    # skip very short or non-alpha words and words already in the vocab
+    unknown = [w for w in dict.fromkeys(words)
+               if len(w) >= 3 and any(ch.isalpha() for ch in w) and w not in vocab and fold(w) not in folded]
+    cache = _spell_cache if threshold == SV_SPELL_THRESHOLD else None
+    fixes = {}
+    if cache is not None:
+        todo = []
+        for w in unknown:
+            fix = cache.get(("sv", w), _MISSING)
+            if fix is _MISSING:
+                todo.append(w)
+            elif fix != w:
+                fixes[w] = fix
+        unknown = todo
+    index = swedish_symspell()
+    for block in _chunked(unknown, chunksize):
+        owner, ids = index.candidate_ids(block)
+        if not owner.size:
+            continue
+        queries = np.array(block, dtype=object)
+        # below threshold similarities come back as 0
+        sim = process.cpdist(queries[owner], index.take(ids), scorer=JaroWinkler.normalized_similarity,
+                             score_cutoff=threshold / 100, workers=-1)
+        keep = sim > 0
+        owner, ids, sim = owner[keep], ids[keep], sim[keep]
+        dist = process.cpdist(queries[owner], index.take(ids), scorer=DamerauLevenshtein.distance,
+                              score_cutoff=index.max_distance, workers=-1)
+        keep = dist <= index.max_distance
+        owner, ids, dist, sim = owner[keep], ids[keep], dist[keep], sim[keep]
+        # best per word: highest similarity, then fewest edits, then alphabetical
+        order = np.lexsort((ids, dist, -sim, owner))
+        first = order[np.r_[True, owner[order][1:] != owner[order][:-1]]] if order.size else order
+        for k, i in zip(owner[first], ids[first]):
+            fixes[block[k]] = index.words[i]
+    if cache is not None:
+        for w in unknown:  # words left as they are are cached too
+            cache.put(("sv", w), fixes.get(w, w))
+    return fixes
+
+def correct_word_sv(word, threshold=SV_SPELL_THRESHOLD):
+    """Closest Swedish vocabulary word (see correct_words_sv), or word unchanged."""
+    w = word.strip()
+    return correct_words_sv([w], threshold).get(w, word)
 
+def correct_swedish_tokens(tokens, is_word):
+    """Fuzzy-correct the word tokens of a token list in one batch (punctuation kept)."""
+    fixes = correct_words_sv(t for t, w in zip(tokens, is_word) if w)
+    if not fixes:
+        return tokens
+    return [fixes.get(t, t) if w else t for t, w in zip(tokens, is_word)]
 
-def normalize_and_spellcheck(text, lang="en"):
+def correct_swedish_turn(turn):
+    """Fuzzy-correct the words of a Turn; returns a new Turn (punctuation kept)."""
+    return turn.with_tokens(correct_swedish_tokens(turn.tokens, turn.is_word))
+
+def correct_swedish_text(text):
+    # keep punctuation and spacing; operate per token
+    return correct_swedish_turn(Turn(text)).text
+
+def correct_swedish_batch(texts, chunksize=10000):
+    """Yield correct_swedish_text of each line in texts, correcting each chunk's words together."""
+    for chunk in _chunked(texts, chunksize):
+        turns = [Turn(text) for text in chunk]
+        fixes = correct_words_sv(t for turn in turns for t, is_word in zip(turn.tokens, turn.is_word) if is_word)
+        for turn in turns:
+            yield (turn.with_tokens([fixes.get(t, t) if is_word else t
+                                     for t, is_word in zip(turn.tokens, turn.is_word)]).text
+                   if fixes else turn.text)
+
+def correct_english_tokens(tokens, is_word, spell=None):
+    """pyspellchecker (or a SymSpell index) over the word tokens of a token list (punctuation kept)."""
+    if spell is None:
+        spell = english_spellchecker()
+    unknown = spell.unknown([t for t, w in zip(tokens, is_word) if w])
+    if not unknown:
+        return tokens
+    if isinstance(spell, SymSpell):
+        fixes = cached_corrections("en", unknown, spell.corrections)
+    else:
+        fixes = {t: cached_correction("en", t, spell.correction) for t in unknown}
+    fixes = {t: fix or t for t, fix in fixes.items()}
+    return [fixes[t] if w and t in fixes else t for t, w in zip(tokens, is_word)]
+
+def correct_english_turn(turn):
+    """pyspellchecker over the words of a Turn; returns a new Turn (punctuation kept)."""
+    out = correct_english_tokens(turn.tokens, turn.is_word)
+    return turn if out is turn.tokens else turn.with_tokens(out)
+
+
+def normalize_and_spellcheck(text, lang=DEFAULT_LANGUAGE):
     # Step 1: normalize slang and contractions
     text = normalize_input(text)
 
-    if lang == "en":
-        # Step 2: pyspellchecker (English)
-        words = text.split()
-        fixed = [spell_en.correction(w) if w not in spell_en else w for w in words]
-        return " ".join(fixed)
+    # Step 2: the language pack's spell corrector
+    return auto_correct(text, lang)
 
-    elif lang == "sv":
-        # Step 2: Swedish fuzzy correction
-        return correct_swedish_text(text)
+@_spell_loader
+def english_spellchecker():
+    """pyspellchecker's English dictionary, loaded on first use."""
+    return SpellChecker(language="en")
 
-    return text
+_SYMSPELL_CACHE_VERSION = b"symspell-v1"  # bump when the index layout changes
+
+class SymSpell:
+    """
+    Symmetric-delete spelling index over a word -> count map or a WordTable (every count 1).
+    Gives pyspellchecker's suggestions for `in`, unknown() and correction().
+    """
 
-spell_en = SpellChecker(language="en")
-# For Swedish, provide your own dictionary file with common words:
-# spell_sv = SpellChecker(language=None, local_dictionary="swedish_words.txt")
-
-def auto_correct(text, lang="en"):
-    spell = spell_en  # or spell_sv if you're handling Swedish
-    words = text.split()
-    corrected = []
-    for w in words:
-        if w in spell:  # known word
-            corrected.append(w)
+    def __init__(self, frequencies, max_distance=2, prefix_length=7, cache_dir=None):
+        if isinstance(frequencies, WordTable):
+            self.frequencies = None
+            self.words = self.known = frequencies
+            self.lengths = frequencies.lengths
+            self.counts = np.ones(len(frequencies), dtype=np.int64)
+            self.ascii = np.diff(frequencies.offsets) == frequencies.lengths  # one byte per letter
         else:
-            correction = spell.correction(w)
-            corrected.append(correction if correction else w)
-    return " ".join(corrected)
+            self.frequencies = self.known = frequencies  # word -> count
+            self.words = sorted(frequencies)
+            self._word_array = np.array(self.words, dtype=object)  # for gathering candidates by id
+            self.lengths = np.fromiter(map(len, self.words), dtype=np.int32, count=len(self.words))
+            self.counts = np.fromiter(map(frequencies.__getitem__, self.words), dtype=np.int64, count=len(self.words))
+            self.ascii = np.fromiter(map(str.isascii, self.words), dtype=bool, count=len(self.words))
+        self.longest = int(self.lengths.max(initial=0))
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.keys, self.ids = self._load_index(cache_dir)
+
+    def __contains__(self, word):
+        return word.lower() in self.known
+
+    def take(self, ids):
+        """The dictionary words with these ids."""
+        return self.words.take(ids) if self.frequencies is None else self._word_array[ids]
+
+    def _deletes(self, term):
+        """term's prefix and every string made from it by up to max_distance deletions."""
+        found = frontier = {term[:self.prefix_length]}
+        for _ in range(self.max_distance):
+            frontier = {t[:i] + t[i + 1:] for t in frontier if len(t) > 1 for i in range(len(t))}
+            found = found | frontier
+        return found
+
+    def _build_index(self):
+        keys, ids = [], []
+        for i, word in enumerate(self.words):
+            deletes = self._deletes(word)
+            keys.extend(zlib.crc32(d.encode("utf-8")) for d in deletes)
+            ids.extend(itertools.repeat(i, len(deletes)))
+        keys = np.array(keys, dtype=np.uint32)
+        order = np.argsort(keys, kind="stable")
+        return np.stack([keys[order], np.array(ids, dtype=np.uint32)[order]])
+
+    def _load_index(self, cache_dir):
+        """The (2, n) index, memory-mapped from cache_dir if saved there for the same words, else built and saved."""
+        if cache_dir is None:
+            table = self._build_index()
+            return table[0], table[1].view(np.int32)
+        header = f"{self.max_distance},{self.prefix_length}\n".encode()
+        words = self.words.digest() if self.frequencies is None else "\n".join(self.words).encode("utf-8")
+        digest = hashlib.sha256(_SYMSPELL_CACHE_VERSION + header + words)
+        cache_path = os.path.join(cache_dir, f"symspell.{digest.hexdigest()[:24]}.npy")
+        try:
+            table = np.load(cache_path, mmap_mode="r")
+        except (OSError, ValueError):
+            table = self._build_index()
+            try:  # replacing the indexes of earlier word lists
+                _write_atomic(cache_path, lambda f: np.save(f, table),
+                              lambda old: old.startswith("symspell.") and old.endswith(".npy"))
+            except OSError:
+                pass  # read-only install: rebuild on every start
+        return table[0], table[1].view(np.int32)
+
+    def _should_check(self, word):
+        """pyspellchecker's rules for tokens it never tries to correct."""
+        if len(word) == 1 and word in string.punctuation:
+            return False
+        if len(word) > self.longest + 3 or word == "nan":
+            return False
+        try:
+            float(word)
+            return False
+        except ValueError:
+            return True
+
+    def unknown(self, words):
+        """The lowercased words that are not in the dictionary."""
+        return {w for w in map(str.lower, words) if self._should_check(w) and w not in self.known}
+
+    def candidate_ids(self, words):
+        """
+        (owner, ids): each index into words paired with the ids of the words sharing a delete with it.
+        A superset of those within max_distance, sorted by owner then id.
+        """
+        hashes, owner = [], []
+        for k, word in enumerate(words):
+            deletes = self._deletes(word)
+            hashes.extend(zlib.crc32(d.encode("utf-8")) for d in deletes)
+            owner.extend(itertools.repeat(k, len(deletes)))
+        hashes = np.array(hashes, dtype=np.uint32)
+        lo = np.searchsorted(self.keys, hashes, "left")
+        counts = np.searchsorted(self.keys, hashes, "right") - lo
+        # every position of every matching run in self.ids, tagged with its query
+        total = int(counts.sum())
+        positions = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+        owner = np.repeat(np.array(owner, dtype=np.intp), counts)
+        ids = self.ids[positions]
+        # words sharing a long prefix collide a lot; drop those too long or short to be close
+        lengths = np.fromiter(map(len, words), dtype=np.int32, count=len(words))
+        keep = np.abs(self.lengths[ids].astype(np.int32) - lengths[owner]) <= self.max_distance
+        pairs = np.sort((owner[keep].astype(np.int64) << 32) | ids[keep].astype(np.int64))
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if pairs.size else pairs
+        return (pairs >> 32).astype(np.intp), (pairs & 0xFFFFFFFF).astype(np.intp)
+
+    def _scored(self, words):
+        """(owner, ids, distances) of the candidates within max_distance, all scored in one cpdist call."""
+        owner, ids = self.candidate_ids(words)
+        if not owner.size:
+            return owner, ids, owner
+        # starting worker threads costs more than scoring one word's candidates
+        dist = process.cpdist(np.array(words, dtype=object)[owner], self.take(ids),
+                              scorer=DamerauLevenshtein.distance, score_cutoff=self.max_distance,
+                              workers=-1 if len(words) > 1 else 1)
+        keep = dist <= self.max_distance
+        return owner[keep], ids[keep], dist[keep]
+
+    def candidates(self, word):
+        """{dictionary word: Damerau-Levenshtein distance} for every word within max_distance of word."""
+        _, ids, dist = self._scored([word])
+        return dict(zip(self.take(ids), dist.tolist()))
+
+    def correction(self, word):
+        """
+        pyspellchecker's choice: an accent-only match, else the most frequent word at the fewest edits.
+        word itself if known or not worth checking, None if nothing is close.
+        """
+        return self.corrections([word])[word]
+
+    def corrections(self, words):
+        """{word: correction(word)} for each of words, with the candidates of all of them scored together."""
+        fixes, todo = {}, {}
+        for word in words:
+            if word.lower() in self.known or not self._should_check(word):
+                fixes[word] = word
+            else:
+                fixes[word] = None
+                todo.setdefault(word.lower(), []).append(word)
+        queries = list(todo)
+        owner, ids, dist = self._scored(queries)
+        if not owner.size:
+            return fixes
+        # a candidate differing only in accents has the same length and isn't all ASCII where the word is
+        lengths = np.fromiter(map(len, queries), dtype=np.int32, count=len(queries))
+        ascii = np.fromiter(map(str.isascii, queries), dtype=bool, count=len(queries))
+        other = np.ones(owner.size, dtype=bool)
+        for k in np.flatnonzero((self.lengths[ids] == lengths[owner]) & ~(self.ascii[ids] & ascii[owner])).tolist():
+            other[k] = fold(self.words[ids[k]]) != fold(queries[owner[k]])
+        # best per word: accents only, then fewest edits, most frequent, alphabetical (ids are)
+        order = np.lexsort((ids, -self.counts[ids], dist, other, owner))
+        first = order[np.r_[True, owner[order][1:] != owner[order][:-1]]]
+        for k, fix in zip(owner[first].tolist(), self.take(ids[first])):
+            for word in todo[queries[k]]:
+                fixes[word] = fix
+        return fixes
+
+@_spell_loader
+def english_symspell():
+    """SymSpell index over pyspellchecker's English dictionary, loaded on first use."""
+    return SymSpell(english_spellchecker().word_frequency.dictionary,
+                    cache_dir=os.path.join(LANGUAGES_DIR, "en", "__pycache__"))
+
+def correct_symspell_tokens(tokens, is_word):
+    """English correction through the SymSpell index (same suggestions as pyspellchecker)."""
+    return correct_english_tokens(tokens, is_word, english_symspell())
+
+# Spell correctors a pack can name in its "spell": {"corrector": ...} entry;
+# each maps (tokens, is_word) to corrected tokens
+SPELL_CORRECTORS = {
+    "pyspellchecker": correct_english_tokens,
+    "symspell": correct_symspell_tokens,
+    "swedish-fuzzy": correct_swedish_tokens,
+}
+
+# Resources each corrector loads lazily (so a language can be warmed up early)
+SPELL_LOADERS = {
+    "pyspellchecker": english_spellchecker,
+    "symspell": english_symspell,
+    "swedish-fuzzy": swedish_symspell,
+}
+
+def correct_turn(turn, language, segments=None):
+    """
+    Spell-correct a Turn with its language pack's corrector, or each of segments in its own language.
+    Returns the Turn unchanged if nothing was corrected.
+    """
+    out = turn.tokens
+    for seg in segments or [Segment(language, 0, len(turn.tokens))]:
+        corrector = SPELL_CORRECTORS.get(language_pack(seg.language).spell.get("corrector"))
+        if corrector is None:
+            continue
+        tokens = turn.tokens[seg.start:seg.end]
+        fixed = corrector(tokens, turn.is_word[seg.start:seg.end])
+        if fixed is not tokens and fixed != tokens:
+            if out is turn.tokens:
+                out = list(turn.tokens)
+            out[seg.start:seg.end] = fixed
+    return turn if out is turn.tokens else turn.with_tokens(out)
+
+def auto_correct(text, lang=DEFAULT_LANGUAGE):
+    """Spell-correct text with the language pack's corrector (punctuation kept)."""
+    return correct_turn(Turn(text), lang).text
 
 def _word_safe_for_typo(w):
     if len(w) < 4: return False
@@ -384,42 +846,33 @@ def _apply_typo(w):
     return pre + w_new + post
 
 def _insert_filler(text, lang):
-    fillers = EN_FILLERS if lang == "en" else SV_FILLERS
-    f = random.choice(fillers)
+    pack = language_pack(lang)
+    f = random.choice(pack.fillers)
 
     # 50% put at start, else insert mid-sentence
     if random.random() < 0.5:
         return f + ", " + text
     # mid insert before a random comma or just before last clause
-    parts = re.split(r"(,|\band\b|\boch\b)", text, maxsplit=1)
+    breaks = [","] + [rf"\b{re.escape(c)}\b" for c in pack.conjunctions]
+    parts = re.split(f"({'|'.join(breaks)})", text, maxsplit=1)
     if len(parts) > 1:
         return parts[0].strip() + ", " + f + " " + "".join(parts[1:]).lstrip()
     return f + "… " + text
 
 def _light_style_tweaks(text, lang):
-    # small human quirks
+    # small human quirks from the language pack ("I" -> "i", casual particles)
     t = text
-
-    # EN: sometimes lowercase "I", sometimes drop an apostrophe
-    if lang == "en":
-        if random.random() < 0.15:
-            t = re.sub(r"\bI\b", "i", t)
-        if random.random() < 0.12:
-            t = t.replace("don't", "dont").replace("can't", "cant").replace("I'm", "Im")
-
-    # SV: casual particles
-    if lang == "sv":
-        if random.random() < 0.12:
-            t = t.replace(" Jag ", " Asså jag ").replace(" jag ", " asså jag ")
-        if random.random() < 0.1:
-            t = re.sub(r"\binte\b", "inte riktigt", t, count=1)
+    for prob, replacements, count in language_pack(lang).style_quirks:
+        if random.random() < prob:
+            for regex, repl in replacements:
+                t = regex.sub(repl, t, count=count)
 
     # occasional triple dots or spaced ellipsis
     if random.random() < 0.15:
         t = re.sub(r"[.?!]$", "…", t)
     return t
 
-def humanize_text(text, lang="en",
+def humanize_text(text, lang=DEFAULT_LANGUAGE,
                   typo_prob=0.22,    # chance to add typos
                   max_typos=2,
                   filler_prob=0.18,  # chance to add a filler
@@ -451,42 +904,239 @@ def humanize_text(text, lang="en",
 
     return txt
 
+_DETECT_TOKEN_RE = re.compile(r"\w+")
+
+def language_scores(text_lower, words=None, languages=None):
+    """
+    {code: recognition words plus words in letters only that language uses} for every installed language.
+    words, if given, are the already tokenized words (see Turn).
+    """
+    tokens = set(_DETECT_TOKEN_RE.findall(text_lower) if words is None else words)
+    folded = {tok: fold(tok) for tok in tokens}
+    folded_set = set(folded.values())
+    scores = {}
+    for code in languages or available_languages():
+        pack = language_pack(code)
+        hits = folded_set & pack.recognition
+        scores[code] = len(hits)
+        if pack.letters:
+            scores[code] += sum(1 for tok, f in folded.items()
+                                if f not in hits and not pack.letters.isdisjoint(tok))
+    return scores
+
+def leading_language(scores):
+    """The language with strictly the highest score, or None on a tie or no evidence."""
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    if not ranked or ranked[0][1] <= 0 or (len(ranked) > 1 and ranked[1][1] == ranked[0][1]):
+        return None
+    return ranked[0][0]
+
 def has_swedish_markers(text_lower):
-    """Check if text has strong Swedish hints (letters, words, commands)."""
-    if any(ch in text_lower for ch in "åäö"):
-        return True
-    if any(re.search(rf"\b{word}\b", text_lower) for word in SWEDISH_RECOGNITION_WORDS ):
-        return True
-    if re.search(r"\b(svenska|byta till svenska|switch to swedish)\b", text_lower):
-        return True
-    return False
+    """Check if text has Swedish hints (letters, words)."""
+    return language_scores(text_lower).get("sv", 0) > 0
 
 def has_english_markers(text_lower):
-    """Check if text has strong English hints."""
-    if any(re.search(rf"\b{word}\b", text_lower) for word in ENGLISH_RECOGNITION_WORDS):
-        return True
-    if re.search(r"\b(english|switch to english|/lang en)\b", text_lower):
-        return True
-    return False
+    """Check if text has English hints."""
+    return language_scores(text_lower).get("en", 0) > 0
+
+# Character trigram identifier: per-language log-probabilities over hashed
+# trigrams, stored as small .npy files that are memory-mapped on first use.
+TRIGRAM_BUCKETS = 8192       # power of two; 32 KB of float32 per language
+TRIGRAM_CONFIDENCE = 0.9     # trigram verdicts below this defer to the keyword scores
+
+def trigram_hashes(text_lower, words=None):
+    """Bucket ids of the character trigrams in text (words padded with spaces)."""
+    padded = " " + " ".join(_DETECT_TOKEN_RE.findall(text_lower) if words is None else words) + " "
+    if len(padded) < 3:
+        return np.empty(0, dtype=np.intp)
+    codes = np.frombuffer(padded.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    h = codes[:-2] * np.uint64(0x9E3779B1) ^ codes[1:-1] * np.uint64(0x85EBCA77) ^ codes[2:] * np.uint64(0xC2B2AE3D)
+    h ^= h >> np.uint64(15)
+    return (h % np.uint64(TRIGRAM_BUCKETS)).astype(np.intp)
+
+def train_trigram_model(lines, alpha=0.5):
+    """Smoothed log-probability per trigram bucket for a list of training lines."""
+    counts = np.zeros(TRIGRAM_BUCKETS, dtype=np.float64)
+    for line in lines:
+        line = line.lower()
+        # also learn the ASCII-folded spelling ("jag ar trott") people type without å/ä/ö
+        for variant in {line, fold(line)}:
+            np.add.at(counts, trigram_hashes(variant), 1)
+    counts += alpha
+    return np.log(counts / counts.sum()).astype(np.float32)
+
+def trigram_model_path(language):
+    return os.path.join(LANGUAGES_DIR, language, "trigrams.npy")
+
+@functools.lru_cache(maxsize=None)
+def trigram_languages():
+    """Installed languages that ship a trigram model."""
+    return tuple(code for code in available_languages() if os.path.isfile(trigram_model_path(code)))
+
+def build_trigram_models(languages=None):
+    """(Re)train trigrams.npy for each language from languages/<code>/corpus.txt."""
+    for lang in languages or available_languages():
+        with open(os.path.join(LANGUAGES_DIR, lang, "corpus.txt"), encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+        np.save(trigram_model_path(lang), train_trigram_model(lines))
+    load_trigram_model.cache_clear()
+    trigram_languages.cache_clear()
+
+@functools.lru_cache(maxsize=None)
+def load_trigram_model(language):
+    """Memory-mapped log-probability table for a language (pages shared between workers)."""
+    return np.load(trigram_model_path(language), mmap_mode="r")
+
+def trigram_language_probs(text_lower, languages=None, words=None):
+    """Return {language: probability} for text, or {} if it has no letters."""
+    languages = languages or trigram_languages()
+    hashes = trigram_hashes(text_lower, words)
+    if not hashes.size or not languages:
+        return {}
+    # neighbouring trigrams share two letters: / 3 counts each letter about once, not thrice
+    loglik = np.array([load_trigram_model(lang)[hashes].sum() for lang in languages]) / 3.0
+    probs = np.exp(loglik - loglik.max())
+    probs /= probs.sum()
+    return dict(zip(languages, probs.tolist()))
 
 def parse_lang_command(text_lower):
-    """Parse explicit /lang commands if present."""
-    if text_lower.startswith(("/lang sv", "/language sv", "/lang svenska")) or "switch to swedish" in text_lower:
-        return "sv"
-    if text_lower.startswith(("/lang en", "/language en")) or "switch to english" in text_lower:
-        return "en"
+    """Parse explicit /lang <code> commands or a pack's switch phrases if present."""
+    for code in available_languages():
+        if text_lower.startswith((f"/lang {code}", f"/language {code}")) or \
+                any(phrase in text_lower for phrase in language_pack(code).switch_phrases):
+            return code
     return None
 
 def detect_language_strong(text_lower):
-    """Return 'sv' or 'en' if strong cues detected, else None."""
+    """Return the language code with clearly the most evidence, else None (keep the current one)."""
     cmd = parse_lang_command(text_lower)
     if cmd:
         return cmd
-    if has_swedish_markers(text_lower):
-        return "sv"
-    if has_english_markers(text_lower):
-        return "en"
-    return None
+    probs = trigram_language_probs(text_lower)
+    if probs:
+        best = max(probs, key=probs.get)
+        if probs[best] >= TRIGRAM_CONFIDENCE:
+            return best
+    return leading_language(language_scores(text_lower))
+
+def language_evidence(text_lower, asr_language=None, asr_probability=0.0, words=None):
+    """
+    One turn's vote: (language, strength 0-3), or (None, 0) without cues.
+    A confident Whisper detection wins; otherwise trigram probabilities, then keyword scores.
+    """
+    if asr_language and asr_probability >= ASR_LANGUAGE_CONFIDENCE:
+        return asr_language, 3 if asr_probability >= 0.9 else 2
+    probs = trigram_language_probs(text_lower, words=words)
+    if probs:
+        best = max(probs, key=probs.get)
+        if probs[best] >= TRIGRAM_CONFIDENCE:
+            return best, 3 if probs[best] >= 0.99 else 2
+    best = leading_language(language_scores(text_lower, words))
+    return (best, 1) if best else (None, 0)
+
+class LanguageTracker:
+    """
+    Per-session language with hysteresis over the votes of the last `window` turns.
+    It switches only when another language leads by `switch_margin`; /lang commands switch at once.
+    """
+
+    def __init__(self, language=DEFAULT_LANGUAGE, window=5, switch_margin=3, languages=None):
+        if window < 1 or switch_margin < 1:
+            raise ValueError("window and switch_margin must be >= 1")
+        self.language = language
+        self.window = window
+        self.switch_margin = switch_margin
+        self._mask = (1 << (2 * window)) - 1
+        languages = languages or available_languages()
+        self._votes = dict.fromkeys(languages, 0)    # packed 2-bit strengths, newest lowest
+        self._evidence = dict.fromkeys(languages, 0)  # sum of the packed strengths
+
+    def reset(self, language):
+        """Force a language and forget the window (used for explicit commands)."""
+        self.language = language
+        for lang in self._votes:
+            self._votes[lang] = self._evidence[lang] = 0
+
+    def evidence(self):
+        """Current per-language evidence over the window."""
+        return dict(self._evidence)
+
+    def update(self, text_lower, asr_language=None, asr_probability=0.0, words=None):
+        """Fold one turn into the window and return the (possibly new) active language."""
+        cmd = parse_lang_command(text_lower)
+        if cmd:
+            self.reset(cmd)
+            return cmd
+        voted, strength = language_evidence(text_lower, asr_language, asr_probability, words)
+        oldest = 2 * (self.window - 1)
+        for lang, packed in self._votes.items():
+            self._evidence[lang] -= (packed >> oldest) & 3
+            packed = (packed << 2) & self._mask
+            if lang == voted:
+                packed |= strength
+                self._evidence[lang] += strength
+            self._votes[lang] = packed
+        leader = max(self._evidence, key=self._evidence.get)
+        if leader != self.language and \
+                self._evidence[leader] - self._evidence.get(self.language, 0) >= self.switch_margin:
+            self.language = leader
+        return self.language
+
+# Per-word language tags for code-switched turns ("jag är so tired today")
+WORD_TAG_CONFIDENCE = 0.8
+Segment = collections.namedtuple("Segment", "language start end")  # token range [start, end)
+
+def tag_words(words, languages=None):
+    """Language of each word, or None if unclear: packs' recognition words and letters, else trigrams."""
+    languages = languages or trigram_languages()
+    if not words or not languages:
+        return [None] * len(words)
+    hashes = trigram_hashes("", words)
+    # cumulative log-likelihood per language; word k owns the len(k) trigrams
+    # from " ab" to "yz ", starting at sum(len(j) + 1 for j < k)
+    cum = np.zeros((len(languages), hashes.size + 1))
+    cum[:, 1:] = np.cumsum([load_trigram_model(lang)[hashes] for lang in languages], axis=1)
+    lengths = np.fromiter(map(len, words), dtype=np.intp, count=len(words))
+    starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+    loglik = (cum[:, starts + lengths] - cum[:, starts]) / 3.0
+    probs = np.exp(loglik - loglik.max(axis=0))
+    probs /= probs.sum(axis=0)
+    best = probs.argmax(axis=0)
+
+    packs = [language_pack(lang) for lang in languages]
+    tags = []
+    for k, word in enumerate(words):
+        folded = fold(word)
+        hits = [lang for lang, pack in zip(languages, packs) if folded in pack.recognition]
+        if not hits:
+            hits = [lang for lang, pack in zip(languages, packs) if not pack.letters.isdisjoint(word)]
+        if len(hits) == 1:
+            tags.append(hits[0])
+        elif probs[best[k], k] >= WORD_TAG_CONFIDENCE:
+            tags.append(languages[best[k]])
+        else:
+            tags.append(None)
+    return tags
+
+def language_segments(turn, default):
+    """
+    Split a Turn into [Segment(language, start, end)] runs of same-language tokens.
+    Tokens without a clear language join the run before them; default if no word has one.
+    """
+    if not turn.tokens:
+        return []
+    tags = iter(tag_words(turn.words))
+    segments, current, start = [], None, 0
+    for i, is_word in enumerate(turn.is_word):
+        tag = next(tags) if is_word else None
+        if tag is None or tag == current:
+            continue
+        if current is not None:
+            segments.append(Segment(current, start, i))
+            start = i
+        current = tag
+    segments.append(Segment(current or default, start, len(turn.tokens)))
+    return segments
 
 def format_sentence(text):
     """Capitalize first letter, ensure ending punctuation."""
@@ -501,8 +1151,8 @@ def format_sentence(text):
 # ---------------------------------------------------------
 # Text-to-Speech helpers (pyttsx3, per-call engine)
 # ---------------------------------------------------------
-_voice_names = {"en": None, "sv": None}   # preferred substrings ("Zira", "Bengt")
-_voice_cache = {"en": None, "sv": None}   # resolved IDs
+_voice_names = {}   # language code -> preferred substring, overriding the pack's tts_voice
+_voice_cache = {}   # language code -> resolved ID
 
 def _default_driver():
     """Pick driver backend depending on OS."""
@@ -512,10 +1162,9 @@ def _default_driver():
         return "nsss"
     return None  # Linux defaults to espeak
 
-def tts_prepare(en_voice=None, sv_voice=None):
-    """Set preferred voices by name substring (called once at startup)."""
-    _voice_names["en"] = en_voice
-    _voice_names["sv"] = sv_voice
+def tts_prepare(**voices):
+    """Override the packs' preferred voices by name substring, per language code (e.g. sv="Bengt")."""
+    _voice_names.update(voices)
 
 def _resolve_voice_id(lang):
     """Find and cache a voice ID for the given language."""
@@ -525,7 +1174,7 @@ def _resolve_voice_id(lang):
     voices = engine.getProperty("voices")
 
     # Try explicit preferred name
-    name_sub = _voice_names.get(lang)
+    name_sub = _voice_names.get(lang) or language_pack(lang).tts_voice
     if name_sub:
         for v in voices:
             if name_sub.lower() in v.name.lower():
@@ -533,7 +1182,7 @@ def _resolve_voice_id(lang):
                 return v.id
 
     # Fallback: match language code hints
-    hints = ("en", "eng", "english", "us", "gb") if lang == "en" else ("sv", "swe", "svenska", "swedish", "se")
+    hints = language_pack(lang).tts_hints
     for v in voices:
         meta = (v.name + " " + v.id).lower()
         if any(h in meta for h in hints):
@@ -541,7 +1190,7 @@ def _resolve_voice_id(lang):
             return v.id
     return None
 
-def speak(text, lang="en", rate=175, volume=1.0):
+def speak(text, lang=DEFAULT_LANGUAGE, rate=175, volume=1.0):
     """Speak text by creating a fresh engine each call."""
     engine = pyttsx3.init(driverName=_default_driver())
     engine.setProperty("rate", rate)
@@ -564,19 +1213,135 @@ def asr_init(model_size="medium", use_gpu=True):
     device = "cuda" if use_gpu else "cpu"
     compute_type = "float16" if use_gpu else "int8"
     global _ASR_MODEL
-    _ASR_MODEL = WhisperModel(model_size, device=device, compute_type=compute_type)
+    # two workers: the streaming language detector's calls don't hold up the final decode
+    _ASR_MODEL = WhisperModel(model_size, device=device, compute_type=compute_type, num_workers=2)
 
-def transcribe_audio_whisper(audio_mono_float32, lang_code):
-    """Transcribe mono float32 audio array into text."""
+# Let Whisper pick the spoken language instead of forcing the active one.
+# Confident detections vote for the turn's language without the text detector.
+ASR_DETECT_LANGUAGE = True
+ASR_LANGUAGE_CONFIDENCE = 0.7
+
+def _asr_transcribe(audio_mono_float32, lang_code):
     if _ASR_MODEL is None:
         asr_init()
-    segments, _info = _ASR_MODEL.transcribe(
+    segments, info = _ASR_MODEL.transcribe(
         audio_mono_float32,
         language=lang_code,
         vad_filter=True,
         vad_parameters=dict(min_silence_duration_ms=400)
     )
-    return "".join(seg.text for seg in segments).strip()
+    return "".join(seg.text for seg in segments).strip(), info
+
+def transcribe_audio_whisper(audio_mono_float32, lang_code):
+    """Transcribe mono float32 audio array into text."""
+    return _asr_transcribe(audio_mono_float32, lang_code)[0]
+
+def transcribe_audio_detect(audio_mono_float32, fallback_lang, languages=None):
+    """
+    Transcribe without forcing a language; returns (text, language, probability).
+    Unsupported detections are decoded again in the likeliest supported language (or fallback_lang).
+    """
+    languages = languages or available_languages()
+    text, info = _asr_transcribe(audio_mono_float32, None)
+    if info.language in languages:
+        return text, info.language, info.language_probability
+    ranked = [(lang, p) for lang, p in (getattr(info, "all_language_probs", None) or ()) if lang in languages]
+    lang, prob = max(ranked, key=lambda r: r[1]) if ranked else (fallback_lang, 0.0)
+    return transcribe_audio_whisper(audio_mono_float32, lang), lang, prob
+
+def warm_language(code):
+    """Load a language's pack, rules and spell resources ahead of time, from any thread (not TTS voices)."""
+    pack = language_pack(code)
+    rules_for(pack.code)
+    loader = SPELL_LOADERS.get(pack.spell.get("corrector"))
+    if loader:
+        loader()
+
+# Decide the spoken language from partial audio while SPACE is still held
+ASR_STREAMING_DETECT = True
+
+class StreamingLanguageDetector:
+    """
+    Detects the spoken language from the partial audio every `interval` seconds while SPACE is held.
+    Commits and warms up a language once it reaches `threshold`; stop() never waits for it.
+    """
+
+    def __init__(self, samplerate=16000, interval=0.8, min_seconds=1.0,
+                 threshold=0.85, languages=None):
+        self.samplerate = samplerate
+        self.interval = interval
+        self.min_samples = int(min_seconds * samplerate)
+        self.threshold = threshold
+        self.languages = languages or available_languages()
+        self.language = None       # committed language, if any
+        self.probability = 0.0
+        self.partial = ""          # last partial transcript
+        self._blocks = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def feed(self, block):
+        """Add one recorded block (audio-thread safe)."""
+        with self._lock:
+            self._blocks.append(block)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="streaming-langid", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop watching without waiting for the watcher thread; returns
+        (language, probability), or (None, 0.0) if nothing was committed.
+        """
+        with self._lock:  # no commit can land after this
+            self._stop.set()
+            return self.language, self.probability
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                audio = np.concatenate(self._blocks).flatten() if self._blocks else None
+            if audio is None or audio.size < self.min_samples:
+                continue
+            lang, prob = self._score(audio)
+            if lang and prob >= self.threshold:
+                with self._lock:
+                    if self._stop.is_set():
+                        return  # too late: the final decode has already started
+                    self.language, self.probability = lang, prob
+                warm_language(lang)
+                return
+
+    def _score(self, audio):
+        if _ASR_MODEL is None:
+            asr_init()
+        # language detection runs up front; segments are only decoded if we iterate them
+        segments, info = _ASR_MODEL.transcribe(audio, language=None, beam_size=1,
+                                               condition_on_previous_text=False)
+        whisper = {lang: p for lang, p in (getattr(info, "all_language_probs", None) or ())
+                   if lang in self.languages}
+        if info.language in self.languages:
+            whisper[info.language] = info.language_probability
+        best = max(whisper, key=whisper.get) if whisper else None
+        if best and whisper[best] >= self.threshold:
+            return best, whisper[best]
+        parts = []
+        for seg in segments:  # decoded lazily; give up as soon as SPACE is released
+            if self._stop.is_set():
+                return None, 0.0
+            parts.append(seg.text)
+        self.partial = "".join(parts).strip()
+        text = trigram_language_probs(self.partial.lower(), self.languages)
+        if not text:
+            return best, whisper.get(best, 0.0)
+        fused = dict(text)
+        if best:  # Whisper's pick backed by the text: noisy-or of two independent sources
+            fused[best] = 1 - (1 - whisper[best]) * (1 - text.get(best, 0.0))
+        best = max(fused, key=fused.get)
+        return best, fused[best]
 
 # ---------------------------------------------------------
 # Push-to-talk audio capture (hold SPACE to record)
@@ -584,10 +1349,10 @@ def transcribe_audio_whisper(audio_mono_float32, lang_code):
 def record_while_holding_space(
     wait_timeout=10, max_seconds=12,
     samplerate=16000, blocksize=1024,
-    already_pressed=False,
+    already_pressed=False, on_block=None,
 ):
     """
-    Record microphone input while SPACE is held down.
+    Record microphone input while SPACE is held down (on_block gets each block, on the audio thread).
     Returns: float32 numpy array with recorded samples.
     """
     q = queue.Queue()
@@ -609,7 +1374,10 @@ def record_while_holding_space(
 
     def callback(indata, frames, time_info, status):
         if listening.is_set():
-            q.put(indata.copy())
+            block = indata.copy()
+            q.put(block)
+            if on_block is not None:
+                on_block(block)
 
     with sd.InputStream(samplerate=samplerate, channels=1, dtype="float32",
                         blocksize=blocksize, callback=callback):
@@ -632,475 +1400,686 @@ def record_while_holding_space(
         flush_input_buffer()
     return np.concatenate(frames).flatten() if frames else np.array([], dtype="float32")
 
+# ---------------------------------------------------------
+# ELIZA rule engine (compiled once, shared by every session)
+# ---------------------------------------------------------
+class ReplyTemplate:
+    """
+    A reply pre-split at load time into literal parts and "{n}" slots, so
+    filling it is a join instead of a str.format parse on every turn.
+    """
+    __slots__ = ("text", "parts", "slots", "arity")
+
+    def __init__(self, text):
+        parts, slots, literal = [], [], ""
+        for chunk, field, spec, conversion in string.Formatter().parse(text):
+            literal += chunk
+            if field is None:
+                continue
+            if spec or conversion or not (field == "" or field.isdigit()):
+                raise ValueError(f"Unsupported placeholder {{{field}}} in reply: {text!r}")
+            parts.append(literal)
+            literal = ""
+            slots.append(int(field) if field else len(slots))
+        parts.append(literal)
+        self.parts = tuple(parts)
+        self.slots = tuple(slots)
+        self.arity = max(slots) + 1 if slots else 0  # fills this template needs
+        self.text = parts[0] if not slots else text  # constant replies come back as-is
+
+    def fill(self, fills):
+        if not self.slots:
+            return self.text
+        if len(self.slots) == 1:  # the usual "... {0} ..." reply
+            return self.parts[0] + fills[self.slots[0]] + self.parts[1]
+        out = [self.parts[0]]
+        for slot, literal in zip(self.slots, self.parts[1:]):
+            out.append(fills[slot])
+            out.append(literal)
+        return "".join(out)
+
+    def __repr__(self):
+        return f"ReplyTemplate({self.text!r})"
+
+_WORD_RE = re.compile(r"\w+")
+
+def _split_branches(pattern):
+    """Split a regex on its top-level '|' (ignoring groups, classes and escapes)."""
+    branches, depth, start, i = [], 0, 0, 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 1
+        elif ch == "[":
+            i = pattern.index("]", i + 2 if pattern[i + 1:i + 2] == "]" else i + 1)
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            branches.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    branches.append(pattern[start:])
+    return branches
+
+def _required_words(branch):
+    """Words that must appear (case-insensitively) in any text this branch matches."""
+    runs, run, i = [], [], 0
+    while i < len(branch):
+        ch = branch[i]
+        if ch == "\\":
+            esc = branch[i + 1]
+            i += 2
+            if esc.isalnum():  # \w, \d, \b ... are classes/assertions, not literals
+                runs.append("".join(run)); run = []
+                continue
+            run.append(esc)
+        elif ch in "([":
+            # skip the whole group or class; whatever it matches is not a fixed literal
+            close = ")" if ch == "(" else "]"
+            depth, i = 1, i + 1
+            while depth:
+                if branch[i] == "\\":
+                    i += 1
+                elif branch[i] == ch and close == ")":
+                    depth += 1
+                elif branch[i] == close:
+                    depth -= 1
+                i += 1
+            runs.append("".join(run)); run = []
+            continue
+        elif ch in ".^$":
+            runs.append("".join(run)); run = []
+            i += 1
+            continue
+        elif ch in "?*{":
+            if run:
+                run.pop()  # the previous char is optional
+            runs.append("".join(run)); run = []
+            if ch == "{":
+                i = branch.index("}", i)
+            i += 1
+            continue
+        elif ch == "+":
+            runs.append("".join(run)); run = []
+            i += 1
+            continue
+        else:
+            run.append(ch)
+        i += 1
+    runs.append("".join(run))
+    return [w.casefold() for r in runs for w in _WORD_RE.findall(r)]
+
+def _starts_with_wildcard(pattern):
+    """True if every top-level branch begins with an unanchored greedy (.*)."""
+    return all(b.startswith("(.*)") for b in _split_branches(pattern))
+
+# Lazily skip whole lines: with a leading (.*) the leftmost match always
+# starts at a line start, so there is no need to retry every offset.
+_LINE_SKIP = r"(?:[^\n]*\n)*?"
+
+def fold_pattern(pattern):
+    """fold() a rule pattern for ASCII-only input, anchoring branches that start with a letter at a word."""
+    if pattern.isascii():
+        return pattern
+    return "|".join(r"(?<!\w)" + b if b[:1].isalnum() else b
+                    for b in map(fold, _split_branches(pattern)))
+
+def rule_keywords(pattern):
+    """Pick one trigger keyword per top-level branch ('' if the branch has none)."""
+    keywords = []
+    for branch in _split_branches(pattern):
+        words = _required_words(branch)
+        keywords.append(max(words, key=len) if words else "")
+    return tuple(keywords)
+
+def compile_reflections(table):
+    """Compile a pronoun table into a one-pass reflect(fragment) that keeps all other text as written."""
+    words = sorted(table, key=len, reverse=True)  # longest first: "i've" before "i"
+    regex = re.compile(r"(?<![\w'])(?:%s)(?![\w'])" % "|".join(map(re.escape, words))) if words else None
+    swap = lambda m: table[m.group()]
+
+    def reflect(fragment):
+        fragment = fragment.lower()
+        if regex is not None:
+            fragment = regex.sub(swap, fragment)
+        return fragment.strip().rstrip(".!?…").rstrip()
+    return reflect
+
+class RuleSet:
+    """
+    Compiled rule table for one language, tried through a keyword index in table order.
+    rules are (pattern, replies, keywords) triples in priority order; keywords=None derives them.
+    """
+
+    def __init__(self, rules, reflections=(), fallback="", language="", flags=re.IGNORECASE):
+        self.language = language
+        self.fallback = fallback
+        self.flags = flags
+        self.reflections = MappingProxyType(dict(reflections))
+        self.reflect = compile_reflections(self.reflections)
+        self.rules = tuple(
+            (re.compile(pattern, flags), tuple(ReplyTemplate(r) for r in replies))
+            for pattern, replies, _keywords in rules
+        )
+        # per-rule matcher with re.search semantics (same captures); the
+        # folded ones are for ASCII-only input and differ only for accented rules
+        self._matchers = tuple(self._matcher(regex.pattern) for regex, _replies in self.rules)
+        self._folded_matchers = tuple(
+            matcher if regex.pattern.isascii() else self._matcher(fold_pattern(regex.pattern))
+            for matcher, (regex, _replies) in zip(self._matchers, self.rules)
+        )
+        self.fused, self._fused_slots = self._fuse()
+        self._folded_fused = self._fuse(fold_pattern)[0] if self.fused is not None else None
+        self.always = 0        # bitmask of rules with a keyword-free branch
+        self.keywords = {}     # keyword -> bitmask of rules it can trigger
+        for i, (pattern, _replies, keywords) in enumerate(rules):
+            for kw in (rule_keywords(pattern) if keywords is None else keywords):
+                if kw:
+                    kw = fold(kw)
+                    self.keywords[kw] = self.keywords.get(kw, 0) | (1 << i)
+                else:
+                    self.always |= 1 << i
+        # token -> rule bitmask, shared by every session using this rule set
+        self._token_mask = functools.lru_cache(maxsize=65536)(self._lookup_token)
+
+    def __getstate__(self):
+        # closures and caches are rebuilt on load; everything else pickles as-is
+        state = dict(self.__dict__, reflections=dict(self.reflections))
+        del state["reflect"], state["_token_mask"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.reflections = MappingProxyType(state["reflections"])
+        self.reflect = compile_reflections(self.reflections)
+        self._token_mask = functools.lru_cache(maxsize=65536)(self._lookup_token)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __getitem__(self, i):
+        return self.rules[i]
+
+    def _matcher(self, pattern):
+        if _starts_with_wildcard(pattern):
+            return re.compile(_LINE_SKIP + f"(?:{pattern})", self.flags).match
+        return re.compile(pattern, self.flags).search
+
+    def _lookup_token(self, token):
+        mask = 0
+        for kw, bits in self.keywords.items():
+            if kw in token:
+                mask |= bits
+        return mask
+
+    def candidates(self, text, words=None):
+        """
+        Yield indices of the rules worth trying for this text, in priority order.
+        words are the folded words of text (Turn.folded), if already tokenized.
+        """
+        mask = self.always
+        for token in set(_WORD_RE.findall(fold(text.casefold())) if words is None else words):
+            mask |= self._token_mask(token)
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def search(self, text, deadline=None, words=None):
+        """
+        Return (rule index, captures) for the first rule that matches, else None (also once deadline passes).
+        words are the folded words of text (Turn.folded), if already tokenized.
+        """
+        matchers = self._folded_matchers if text.isascii() else self._matchers
+        for i in self.candidates(text, words):
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            match = matchers[i](text)
+            if match:
+                return i, match.groups()
+        return None
+
+    def _fuse(self, transform=str):
+        """One regex whose i-th alternative succeeds iff rule i matches; returns (pattern or None, group slots)."""
+        parts, slots, group = [], {}, 0
+        for i, (regex, _replies) in enumerate(self.rules):
+            group += 2  # skip group + rule group
+            slots[group] = (i, group, group + regex.groups)
+            skip = _LINE_SKIP if _starts_with_wildcard(regex.pattern) else r"(?s:.*?)"
+            # capturing the skip is measurably faster in CPython's re engine
+            parts.append(f"(?=({skip})({transform(regex.pattern)}))")
+            group += regex.groups
+        try:
+            return re.compile("|".join(parts), self.flags), slots
+        except re.error:  # e.g. a rule with global inline flags; use the index instead
+            return None, {}
+
+    def fused_search(self, text):
+        """Same result as search(), found with a single regex call."""
+        if self.fused is None:
+            return self.search(text)
+        match = (self._folded_fused if text.isascii() else self.fused).match(text)
+        if not match:
+            return None
+        i, start, end = self._fused_slots[match.lastindex]
+        return i, match.groups()[start:end]
+
+# ---------------------------------------------------------
+# Rule scripts (languages/<code>/rules.json) + hot reload
+# ---------------------------------------------------------
+_RULE_CACHE_VERSION = b"rules-v3"  # bump when RuleSet's pickled layout changes
+
+def rule_script_path(language):
+    """Path of the DOCTOR-style rule script for a language code."""
+    return os.path.join(LANGUAGES_DIR, language, "rules.json")
+
+def _check_keywords(pattern, keywords):
+    """Return the index keywords for a rule, or raise ValueError if they are unsafe."""
+    branch_words = [set(_required_words(b)) for b in _split_branches(pattern)]
+    keywords = [kw.casefold() for kw in keywords]
+    for kw in keywords:
+        if not any(kw in words for words in branch_words):
+            raise ValueError(f"keyword {kw!r} is not a literal word of {pattern!r}")
+    for words in branch_words:
+        # every branch must require one of the keywords, or the index could skip a match
+        if words and not words.intersection(keywords):
+            raise ValueError(f"no keyword covers branch {sorted(words)} of {pattern!r}")
+    if not all(branch_words):
+        keywords.append("")  # a keyword-free branch: always try this rule
+    return tuple(keywords)
+
+def parse_rule_script(script, source="<rule script>"):
+    """
+    Validate a decoded rule script and return RuleSet keyword arguments.
+    Format: {"language", "fallback", "reflections", "rules": [{"keywords", "rank", "decomposition", "reassembly"}]}.
+    """
+    if not isinstance(script, dict) or not isinstance(script.get("rules"), list):
+        raise ValueError(f"{source}: expected an object with a 'rules' list")
+    reflections = script.get("reflections", {})
+    if not all(isinstance(k, str) and isinstance(v, str) for k, v in reflections.items()):
+        raise ValueError(f"{source}: reflections must map words to words")
+    ranked = []
+    for n, rule in enumerate(script["rules"]):
+        try:
+            pattern = rule["decomposition"]
+            replies = rule["reassembly"]
+            if not isinstance(replies, list) or not replies:
+                raise ValueError("reassembly must be a non-empty list")
+            re.compile(pattern)
+            for reply in replies:
+                ReplyTemplate(reply)
+            keywords = rule.get("keywords")
+            if keywords is not None:
+                keywords = _check_keywords(pattern, keywords)
+            ranked.append((-int(rule.get("rank", 0)), n, (pattern, replies, keywords)))
+        except (KeyError, TypeError, ValueError, re.error) as e:
+            raise ValueError(f"{source}: rule {n + 1}: {e}") from None
+    ranked.sort(key=lambda r: r[:2])
+    return dict(
+        rules=[entry for _rank, _n, entry in ranked],
+        reflections={k.lower(): v for k, v in reflections.items()},
+        fallback=script.get("fallback", ""),
+        language=script.get("language", ""),
+    )
+
+def load_rule_script(path, use_cache=True):
+    """Load a rule script, through a RuleSet pickled to __pycache__ under the script's hash."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(_RULE_CACHE_VERSION + raw).hexdigest()[:24]
+    name = os.path.basename(path)
+    cache_dir = os.path.join(os.path.dirname(path), "__pycache__")
+    cache_path = os.path.join(cache_dir, f"{name}.{digest}.pickle")
+    if use_cache and os.path.isfile(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:  # stale/corrupt cache: rebuild it
+            print(f"(ignoring rule cache {cache_path}: {e})")
+
+    rules = RuleSet(**parse_rule_script(json.loads(raw.decode("utf-8")), path))
+    if use_cache:
+        try:  # replacing the caches of earlier script versions
+            _write_atomic(cache_path, lambda f: pickle.dump(rules, f, protocol=pickle.HIGHEST_PROTOCOL),
+                          lambda old: old.startswith(name + ".") and old.endswith(".pickle"))
+        except OSError:
+            pass  # read-only install: run without the cache
+    return rules
+
+# Active rule set per language, filled the first time a language is asked
+# for. A (re)load builds the new RuleSet first and then rebinds one dict
+# entry, so turns never lock and never see half a table; the lock only
+# keeps two threads from compiling the same pack at once.
+_ACTIVE_RULES = {}
+_RULES_LOCK = threading.Lock()
+
+def rules_for(language):
+    """Return the shared rule set for a language code, loading it on first use (English by default)."""
+    rules = _ACTIVE_RULES.get(language)
+    if rules is not None:
+        return rules
+    if not language or not os.path.isfile(rule_script_path(language)):
+        language = DEFAULT_LANGUAGE
+    with _RULES_LOCK:
+        rules = _ACTIVE_RULES.get(language)
+        if rules is None:
+            rules = _ACTIVE_RULES[language] = load_rule_script(rule_script_path(language))
+    return rules
+
+def reload_rules(language=None):
+    """Re-read loaded rule scripts from disk and swap them in; a broken script raises and changes nothing."""
+    with _RULES_LOCK:
+        languages = [language] if language else list(_ACTIVE_RULES)
+        fresh = {lang: load_rule_script(rule_script_path(lang)) for lang in languages}
+        _ACTIVE_RULES.update(fresh)
+
+def watch_rule_scripts(interval=2.0):
+    """Hot-reload loaded rule scripts whenever they change on disk. Returns an Event that stops the watcher."""
+    stop = threading.Event()
+
+    def mtimes():
+        stamps = {}
+        for lang in list(_ACTIVE_RULES):
+            try:
+                stamps[lang] = os.stat(rule_script_path(lang)).st_mtime_ns
+            except OSError:
+                stamps[lang] = None
+        return stamps
+
+    def poll():
+        seen = mtimes()
+        while not stop.wait(interval):
+            now = mtimes()
+            for lang, stamp in now.items():
+                # languages loaded since the last poll are already fresh
+                if lang in seen and stamp is not None and stamp != seen[lang]:
+                    try:
+                        reload_rules(lang)
+                        print(f"(reloaded {lang} rules)")
+                    except (OSError, ValueError) as e:
+                        print(f"(kept old {lang} rules: {e})")
+            seen = now
+
+    threading.Thread(target=poll, name="rule-script-watcher", daemon=True).start()
+    return stop
+
+# Per-turn matching limits: long pastes are cut before matching, and a turn
+# the keyword index is still matching after the deadline gets the generic reply.
+MAX_MATCH_CHARS = 4000
+MATCH_DEADLINE = 0.05  # seconds
+
+_REFLECT_WORD_RE = re.compile(r"(?<![\w'])[\w']+(?![\w'])")
+
+def segment_reflector(turn, segments, language):
+    """reflect(fragment) flipping each word with its segment's pronoun table; None if all are in language."""
+    others = {seg.language for seg in segments} - {language}
+    if not others:
+        return None
+    word_language = {}
+    for seg in segments:
+        for token, is_word in zip(turn.tokens[seg.start:seg.end], turn.is_word[seg.start:seg.end]):
+            if is_word:
+                word_language.setdefault(token, seg.language)
+    tables = {lang: rules_for(lang).reflections for lang in others | {language}}
+
+    def swap(m):
+        word = m.group()
+        # "i'd" is tokenized as "i", "'", "d": its language is that of "i"
+        table = tables[word_language.get(word.split("'")[0], language)]
+        return table.get(word, word)
+
+    def reflect(fragment):
+        fragment = _REFLECT_WORD_RE.sub(swap, fragment.lower())
+        return fragment.strip().rstrip(".!?…").rstrip()
+    return reflect
+
+def build_reply(rules, found, choose, reflect=None):
+    """Fill the template chosen by choose(replies) for a (rule index, captures) hit."""
+    index, groups = found
+    template = choose(rules[index][1])
+    if not template.arity:
+        return template.text  # nothing to reflect
+    reflect = reflect or rules.reflect
+    captured = [g for g in groups if g is not None][:template.arity]
+    return template.fill([reflect(g) for g in captured])
+
+def _analyze(rules, text):
+    """Rule match + reflection for a normalized input: (replies, fills) or None."""
+    found = rules.search(text)
+    if not found:
+        return None
+    index, groups = found
+    return rules[index][1], tuple(rules.reflect(g) for g in groups if g is not None)
+
+def configure_reply_cache(maxsize=4096):
+    """(Re)create the process-wide matching + reflection cache of deterministic sessions."""
+    global _reply_cache
+    _reply_cache = functools.lru_cache(maxsize=maxsize)(_analyze)
+    return _reply_cache
+
+configure_reply_cache()
+
+def _chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _respond_chunk(language, chunk, max_chars, rng=None):
+    """Reply to a list of utterances, matching/reflecting each distinct one once."""
+    rules = rules_for(language)
+    search = functools.lru_cache(maxsize=None)(rules.search)
+    reflect = functools.lru_cache(maxsize=None)(rules.reflect)
+    choose = rng.choice if rng is not None else random.choice
+    replies = []
+    for text in chunk:
+        if max_chars:
+            text = text[:max_chars]
+        if rng is not None:  # same normalization as deterministic respond()
+            text = text.lower().strip()
+        found = search(text)
+        replies.append(build_reply(rules, found, choose, reflect) if found else rules.fallback)
+    return replies
+
+def _respond_chunk_seeded(language, chunk, max_chars, seed):
+    """Process-pool entry point: rebuild the chunk's RNG from its seed."""
+    rng = random.Random(seed) if seed is not None else None
+    return _respond_chunk(language, chunk, max_chars, rng)
+
 # --- ELIZA bot ---
 
 class Eliza:
-    def __init__(self, language="en"):
+    def __init__(self, language=DEFAULT_LANGUAGE, matcher="index",
+                 max_input_chars=MAX_MATCH_CHARS, match_deadline=MATCH_DEADLINE,
+                 seed=None):
+        """
+        match_deadline covers only the keyword-index matcher, checked between rules.
+        Fused and seeded (memoized) matching rely on max_input_chars and linear-time rules.
+        """
         self.language = language
-
-        self.responses_english = [
-            (r'I need (.*)',
-             ["Why do you need {0}?",
-              "Would it really help you to get {0}?",
-              "Are you sure you need {0}?"]),
-
-            (r'Why don\'?t you ([^\?]*)\??',
-             ["Do you really think I don't {0}?",
-              "Perhaps I will {0} in the future.",
-              "Do you want me to {0}?"]),
-
-            (r'Why can\'?t I ([^\?]*)\??',
-             ["Do you think you should be able to {0}?",
-              "If you could {0}, what would you do?",
-              "I don't know, why can't you {0}?",
-              "Have you really tried?"]),
-
-            (r'I can\'?t (.*)',
-             ["How do you know you can't {0}?",
-              "Perhaps you could {0} if you tried.",
-              "What would it take for you to {0}?"]),
-
-            (r'I am (.*)',
-             ["Did you come to me because you are {0}?",
-              "How long have you been {0}?",
-              "How do you feel about being {0}?"]),
-
-            (r'I\'?m (.*)',
-             ["How does being {0} make you feel?",
-              "Do you enjoy being {0}?",
-              "Why do you tell me you're {0}?"]),
-
-            (r'Are you ([^\?]*)\??',
-             ["Why does it matter whether I am {0}?",
-              "Would you prefer if I were not {0}?",
-              "Perhaps you believe I am {0}.",
-              "I may be {0}, what do you think?"]),
-
-            (r'What (.*)',
-             ["Why do you ask?",
-              "How would an answer to that help you?",
-              "What do you think?"]),
-
-            (r'How (.*)',
-             ["How do you suppose?",
-              "Perhaps you can answer your own question.",
-              "What is it you're really asking?"]),
-
-            (r'Because (.*)',
-             ["Is that the real reason?",
-              "What other reasons come to mind?",
-              "Does that reason apply to anything else?",
-              "If {0}, what else must be true?"]),
-
-            (r'(.*) sorry (.*)',
-             ["There are many times when no apology is needed.",
-              "What feelings do you have when you apologize?"]),
-
-            (r'Hello(.*)',
-             ["Hello... I'm listening.",
-              "Hi there... how can I help you?",
-              "Hello, how are you feeling today?"]),
-
-            (r'I think (.*)',
-             ["Do you doubt {0}?",
-              "Do you really think so?",
-              "But you're not sure {0}?"]),
-
-            (r'(.*) friend (.*)',
-             ["Tell me more about your friends.",
-              "When you think of a friend, what comes to mind?",
-              "Why don't you tell me about a childhood friend?"]),
-
-            (r'Yes',
-             ["You seem quite sure.",
-              "OK, but can you elaborate a bit?"]),
-
-            (r'(.*) computer(.*)',
-             ["Are you really talking about me?",
-              "Does it seem strange to talk to a computer?",
-              "How do computers make you feel?",
-              "Do you feel threatened by computers?"]),
-
-            (r'Is it (.*)',
-             ["Do you think it is {0}?",
-              "Perhaps it's {0}, what do you think?",
-              "If it were {0}, what would you do?",
-              "It could well be that {0}."]),
-
-            (r'It is (.*)',
-             ["You seem very certain.",
-              "If I told you that it probably isn't {0}, what would you feel?"]),
-
-            (r'Can you ([^\?]*)\??',
-             ["What makes you think I can't {0}?",
-              "If I could {0}, then what?",
-              "Why do you ask if I can {0}?"]),
-
-            (r'Can I ([^\?]*)\??',
-             ["Perhaps you don't want to {0}.",
-              "Do you want to be able to {0}?",
-              "If you could {0}, would you?"]),
-
-            (r'You are (.*)',
-             ["Why do you think I am {0}?",
-              "Does it please you to think that I'm {0}?",
-              "Perhaps you would like me to be {0}.",
-              "Perhaps you're really talking about yourself?"]),
-
-            (r'You\'?re (.*)',
-             ["Why do you say I am {0}?",
-              "Why do you think I am {0}?",
-              "Are we talking about you, or me?"]),
-
-            (r'I don\'?t (.*)',
-             ["Don't you really {0}?",
-              "Why don't you {0}?",
-              "Do you want to {0}?"]),
-
-            (r'I feel (.*)',
-             ["Good, tell me more about these feelings.",
-              "Do you often feel {0}?",
-              "When do you usually feel {0}?",
-              "When you feel {0}, what do you do?"]),
-
-            (r'I have (.*)',
-             ["Why do you tell me that you've {0}?",
-              "Have you really {0}?",
-              "Now that you have {0}, what will you do next?"]),
-
-            (r'I would (.*)',
-             ["Could you explain why you would {0}?",
-              "Why would you {0}?",
-              "Who else knows that you would {0}?"]),
-
-            (r'Is there (.*)',
-             ["Do you think there is {0}?",
-              "It's likely that there is {0}.",
-              "Would you like there to be {0}?"]),
-
-            (r'My (.*)',
-             ["I see, your {0}.",
-              "Why do you say that your {0}?",
-              "When your {0}, how do you feel?"]),
-
-            (r'You (.*)',
-             ["We should be discussing you, not me.",
-              "Why do you say that about me?",
-              "Why do you care whether I {0}?"]),
-
-            (r'Why (.*)',
-             ["Why don't you tell me the reason why {0}?",
-              "Why do you think {0}?"]),
-
-            (r'I want (.*)',
-             ["What would it mean to you if you got {0}?",
-              "Why do you want {0}?",
-              "What would you do if you got {0}?",
-              "If you got {0}, then what would you do?"]),
-
-            (r'(.*) mother(.*)',
-             ["Tell me more about your mother.",
-              "What was your relationship with your mother like?",
-              "How do you feel about your mother?",
-              "How does this relate to your feelings today?",
-              "Good family relations are important."]),
-
-            (r'(.*) father(.*)',
-             ["Tell me more about your father.",
-              "How did your father make you feel?",
-              "How do you feel about your father?",
-              "Does your relationship with your father relate to your feelings today?",
-              "Do you have trouble showing affection with your family?"]),
-
-            (r'(.*) child(.*)',
-             ["Did you have close friends as a child?",
-              "What is your favorite childhood memory?",
-              "Do you remember any dreams or nightmares from childhood?",
-              "Did the other children sometimes tease you?",
-              "How do you think your childhood experiences relate to your feelings today?"]),
-
-            (r'(.*)\?',
-             ["Why do you ask that?",
-              "Please consider whether you can answer your own question.",
-              "Perhaps the answer lies within yourself?",
-              "Why don't you tell me?"]),
-
-            (r'(.*)',
-             ["Please tell me more.",
-              "Let's change focus a bit... Tell me about your family.",
-              "Can you elaborate on that?",
-              "Why do you say that {0}?",
-              "I see.",
-              "Very interesting.",
-              "{0}.",
-              "I see. And what does that tell you?",
-              "How does that make you feel?",
-              "How do you feel when you say that?"])
-        ]
-
-        self.responses_swedish = [
-            (r'Jag behöver (.*)',
-             ["Varför behöver du {0}?",
-              "Skulle det verkligen hjälpa dig att få {0}?",
-              "Är du säker på att du behöver {0}?"]),
-
-            (r'Varför gör du inte ([^\?]*)\??',
-             ["Tror du verkligen att jag inte {0}?",
-              "Kanske kommer jag att {0} i framtiden.",
-              "Vill du att jag ska {0}?"]),
-
-            (r'Varför kan jag inte ([^\?]*)\??',
-             ["Tycker du att du borde kunna {0}?",
-              "Om du kunde {0}, vad skulle du göra då?",
-              "Jag vet inte, varför kan du inte {0}?",
-              "Har du verkligen försökt?"]),
-
-            (r'Jag kan inte (.*)',
-             ["Hur vet du att du inte kan {0}?",
-              "Kanske skulle du kunna {0} om du försökte.",
-              "Vad skulle krävas för att du ska {0}?"]),
-
-            (r'Jag är (.*)',
-             ["Kom du till mig för att du är {0}?",
-              "Hur länge har du varit {0}?",
-              "Hur känns det att vara {0}?"]),
-
-            (r'Är du ([^\?]*)\??',
-             ["Varför spelar det någon roll om jag är {0}?",
-              "Skulle du föredra om jag inte var {0}?",
-              "Kanske tror du att jag är {0}.",
-              "Jag kan vara {0}, vad tror du?"]),
-
-            (r'Vad (.*)',
-             ["Varför frågar du?",
-              "Hur skulle ett svar på det hjälpa dig?",
-              "Vad tror du själv?"]),
-
-            (r'Hur (.*)',
-             ["Hur menar du?",
-              "Kanske kan du besvara din egen fråga.",
-              "Vad är det egentligen du undrar?"]),
-
-            (r'För att (.*)|Eftersom (.*)',
-             ["Är det den verkliga orsaken?",
-              "Vilka andra skäl kommer du att tänka på?",
-              "Gäller den orsaken i andra sammanhang?",
-              "Om {0}, vad mer måste vara sant?"]),
-
-            (r'(.*) förlåt (.*)',
-             ["Det finns många tillfällen då en ursäkt inte behövs.",
-              "Vilka känslor får du när du ber om ursäkt?"]),
-
-            (r'Hej(.*)',
-             ["Hej... jag lyssnar.",
-              "Hej där... hur kan jag hjälpa dig?",
-              "Hej, hur mår du idag?"]),
-
-            (r'Jag tror (.*)',
-             ["Tvivlar du på {0}?",
-              "Tror du verkligen det?",
-              "Men du är inte säker på {0}?"]),
-
-            (r'(.*) vän(.*)',
-             ["Berätta mer om dina vänner.",
-              "Vad tänker du på när du tänker på en vän?",
-              "Varför berättar du inte om en barndomsvän?"]),
-
-            (r'Ja',
-             ["Du verkar ganska säker.",
-              "Okej, men kan du utveckla lite?"]),
-
-            (r'(.*) dator(.*)',
-             ["Pratar du egentligen om mig?",
-              "Känns det märkligt att prata med en dator?",
-              "Hur får datorer dig att känna?",
-              "Känner du dig hotad av datorer?"]),
-
-            (r'Är det (.*)',
-             ["Tycker du att det är {0}?",
-              "Kanske är det {0}, vad tror du?",
-              "Om det vore {0}, vad skulle du göra?",
-              "Det kan mycket väl vara {0}."]),
-
-            (r'Det är (.*)',
-             ["Du verkar väldigt säker.",
-              "Om jag sa att det troligen inte är {0}, hur skulle du känna då?"]),
-
-            (r'Kan du ([^\?]*)\??',
-             ["Varför tror du att jag inte kan {0}?",
-              "Om jag kunde {0}, vad då?",
-              "Varför frågar du om jag kan {0}?"]),
-
-            (r'Kan jag ([^\?]*)\??',
-             ["Kanske vill du inte {0}.",
-              "Vill du kunna {0}?",
-              "Om du kunde {0}, skulle du det?"]),
-
-            (r'Du är (.*)',
-             ["Varför tror du att jag är {0}?",
-              "Gör det dig glad att tänka att jag är {0}?",
-              "Kanske vill du att jag ska vara {0}.",
-              "Kanske pratar du egentligen om dig själv?"]),
-
-            (r'Jag (?:gör|vill|kan) inte (.*)',
-             ["Gör du verkligen inte {0}?",
-              "Varför gör du inte {0}?",
-              "Vill du göra {0}?"]),
-
-            (r'Jag känner mig (.*)',
-             ["Bra, berätta mer om de här känslorna.",
-              "Känner du dig ofta {0}?",
-              "När brukar du känna dig {0}?",
-              "När du känner dig {0}, vad gör du då?"]),
-
-            (r'Jag känner (.*)',
-             ["Berätta mer om de känslorna.",
-              "Känner du ofta {0}?",
-              "När känner du {0}?"]),
-
-            (r'Jag har (.*)',
-             ["Varför berättar du att du har {0}?",
-              "Har du verkligen {0}?",
-              "Nu när du har {0}, vad gör du härnäst?"]),
-
-            (r'Jag skulle (.*)',
-             ["Kan du förklara varför du skulle {0}?",
-              "Varför skulle du {0}?",
-              "Vem mer vet att du skulle {0}?"]),
-
-            (r'Finns det (.*)',
-             ["Tror du att det finns {0}?",
-              "Det är troligt att det finns {0}.",
-              "Skulle du vilja att det fanns {0}?"]),
-
-            (r'Min(?:a|t)? (.*)',
-             ["Jag förstår, din {0}.",
-              "Varför säger du att din {0}?",
-              "När din {0}, hur känns det då?"]),
-
-            (r'Du (.*)',
-             ["Vi borde prata om dig, inte mig.",
-              "Varför säger du det där om mig?",
-              "Varför bryr du dig om huruvida jag {0}?"]),
-
-            (r'Varför (.*)',
-             ["Varför berättar du inte anledningen till varför {0}?",
-              "Varför tror du att {0}?"]),
-
-            (r'Jag vill (.*)',
-             ["Vad skulle det betyda för dig om du fick {0}?",
-              "Varför vill du ha {0}?",
-              "Vad skulle du göra om du fick {0}?",
-              "Om du fick {0}, vad skulle du göra då?"]),
-
-            (r'(.*) mamma(.*)|(.*) mor(.*)',
-             ["Berätta mer om din mamma.",
-              "Hur var din relation med din mamma?",
-              "Hur känner du för din mamma?",
-              "Hur hänger det här ihop med hur du känner idag?",
-              "Bra familjerelationer är viktiga."]),
-
-            (r'(.*) pappa(.*)|(.*) far(.*)',
-             ["Berätta mer om din pappa.",
-              "Hur fick din pappa dig att känna?",
-              "Hur känner du för din pappa?",
-              "Relaterar din relation till din pappa till hur du känner idag?",
-              "Har du svårt att visa känslor i din familj?"]),
-
-            (r'(.*) barndom(.*)|(.*) barn(.*)',
-             ["Hade du nära vänner som barn?",
-              "Vilket är ditt favoritminne från barndomen?",
-              "Minns du några drömmar eller mardrömmar från barndomen?",
-              "Retade de andra barnen dig ibland?",
-              "Hur tycker du att dina barndomsupplevelser hänger ihop med hur du känner idag?"]),
-
-            (r'(.*)\?',
-             ["Varför frågar du det?",
-              "Fundera på om du kan svara på din egen fråga.",
-              "Kanske finns svaret inom dig?",
-              "Varför berättar du inte för mig?"]),
-
-            (r'(.*)',
-             ["Berätta mer.",
-              "Låt oss byta fokus lite... berätta om din familj.",
-              "Kan du utveckla det?",
-              "Varför säger du att {0}?",
-              "Jag förstår.",
-              "Väldigt intressant.",
-              "{0}.",
-              "Jag förstår. Och vad säger det dig?",
-              "Hur får det dig att känna?",
-              "Hur känner du när du säger det?"])
-        ]
-
-        self.reflections = {
-            "am": "are", "was": "were",
-            "i": "you", "i'd": "you would", "i've": "you have", "i'll": "you will",
-            "my": "your", "are": "am", "you've": "i have", "you'll": "i will",
-            "your": "my", "yours": "mine", "you": "me", "me": "you",
-            "jag": "du", "mig": "dig", "min": "din", "mitt": "ditt", "mina": "dina",
-            "du": "jag", "dig": "mig", "din": "min", "ditt": "mitt", "dina": "mina"
-        }
+        self.matcher = matcher  # "index" (keyword dispatch) or "fused" (one regex per turn)
+        self.max_input_chars = max_input_chars
+        self.match_deadline = match_deadline  # None disables the deadline (index matcher only)
+        # Deterministic mode: private seeded RNG + memoized matching (configure_reply_cache)
+        self.rng = random.Random(seed) if seed is not None else None
 
     def get_active_rules(self):
-        """Return language-specific response rules."""
-        return self.responses_swedish if self.language == "sv" else self.responses_english
-
-    def respond(self, user_statement):
-        """Generate ELIZA-style reply based on regex pattern matching."""
-        for regex_pattern, possible_replies in self.get_active_rules():
-            match = re.search(regex_pattern, user_statement, re.IGNORECASE)
-            if match:
-                template = random.choice(possible_replies)
-                fills = [self.reflect_text(g) for g in match.groups() if g is not None]
-                return template.format(*fills)
-        return "I'm not sure I understand you fully." if self.language == "en" else "Jag är inte säker på att jag förstår dig helt."
+        """Return language-specific response rules (compiled on first use, shared process-wide)."""
+        return rules_for(self.language)
+
+    def respond(self, user_statement, words=None, reflect=None):
+        """
+        Generate ELIZA-style reply based on regex pattern matching.
+        words: Turn.folded if already tokenized; reflect: pronoun flipper for the captures.
+        """
+        if self.max_input_chars and len(user_statement) > self.max_input_chars:
+            user_statement = user_statement[:self.max_input_chars]
+            words = None  # no longer the same text
+        if self.rng is not None and reflect is None:
+            # no deadline here: a timed-out match must never end up cached
+            rules = self.get_active_rules()
+            hit = _reply_cache(rules, user_statement.lower().strip())
+            if hit is None:
+                return rules.fallback
+            replies, fills = hit
+            return self.rng.choice(replies).fill(fills)
+        rules = self.get_active_rules()
+        if self.matcher == "fused":
+            found = rules.fused_search(user_statement)
+        else:
+            deadline = None
+            if self.match_deadline is not None:
+                deadline = time.perf_counter() + self.match_deadline
+            found = rules.search(user_statement, deadline, words)
+        if found:
+            return build_reply(rules, found, self.rng.choice if self.rng is not None else random.choice, reflect)
+        return rules.fallback
+
+    def respond_turn(self, turn, segments=None):
+        """Reply to a Turn, matched whole; segments steer spell correction and pronoun flipping."""
+        reflect = segment_reflector(turn, segments, self.language) if segments else None
+        return self.respond(turn.text, turn.folded, reflect)
+
+    def respond_batch(self, texts, language=None, processes=None, chunksize=512):
+        """
+        Yield one reply per utterance in texts (any iterable), in order, matching each distinct line once.
+        processes > 1 spreads chunks over a process pool; no match deadline applies.
+        """
+        language = language or self.language
+        chunks = _chunked(texts, chunksize)
+        if not processes or processes <= 1:
+            for chunk in chunks:
+                yield from _respond_chunk(language, chunk, self.max_input_chars, self.rng)
+            return
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            pending = collections.deque()
+            for chunk in chunks:
+                seed = self.rng.randrange(2**32) if self.rng is not None else None
+                pending.append(pool.submit(_respond_chunk_seeded, language, chunk,
+                                           self.max_input_chars, seed))
+                if len(pending) >= 2 * processes:  # bound memory on huge corpora
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    @staticmethod
+    def cache_info():
+        """Hit/miss statistics of the deterministic-mode cache."""
+        return _reply_cache.cache_info()
 
     def reflect_text(self, fragment):
-        """Flip pronouns/perspective (e.g., 'I' -> 'you')."""
+        """Flip pronouns/perspective (e.g., 'I' -> 'you') in one regex pass."""
         if fragment is None:
             return ""
-        words = re.findall(r"\b[\wåäöÅÄÖ']+\b", fragment.lower())
-        reflected = [self.reflections.get(w, w) for w in words]
-        return " ".join(reflected)
+        return self.get_active_rules().reflect(fragment)
 
 # ---------------------------------------------------------
 # Input/output helpers
 # ---------------------------------------------------------
 def lang_to_bcp47(active_language):
-    """Convert 'en'/'sv' to full language tag (used for TTS)."""
-    return "sv-SE" if active_language == "sv" else "en-US"
+    """Convert a language code to its full language tag (used for TTS)."""
+    return language_pack(active_language).bcp47
+
+_TURN_TOKEN_RE = re.compile(r"(?P<word>\w+)|[^\w\s]")
+
+class Turn:
+    """
+    One user utterance (lower-cased), tokenized once for every stage of the turn.
+    words and folded are its word tokens, case-folded and ASCII-folded; see with_tokens() for corrections.
+    """
+    __slots__ = ("raw", "text", "tokens", "spans", "is_word", "words", "folded",
+                 "asr_language", "asr_probability")
+
+    def __init__(self, raw, asr_language=None, asr_probability=0.0):
+        self.raw = raw
+        self.asr_language = asr_language
+        self.asr_probability = asr_probability
+        self.text = raw.lower()
+        matches = list(_TURN_TOKEN_RE.finditer(self.text))
+        self._set_tokens([m.group() for m in matches], [m.span() for m in matches],
+                         [m.lastgroup == "word" for m in matches])
+
+    def _set_tokens(self, tokens, spans, is_word):
+        self.tokens = tokens
+        self.spans = spans
+        self.is_word = is_word
+        self.words = [t.casefold() for t, w in zip(tokens, is_word) if w]
+        self.folded = fold(" ".join(self.words)).split(" ") if self.words else []
+
+    def with_tokens(self, tokens):
+        """
+        New Turn with the same token kinds but replaced token strings; the
+        original whitespace between tokens is kept.
+        """
+        new = object.__new__(Turn)
+        new.raw = self.raw
+        new.asr_language = self.asr_language
+        new.asr_probability = self.asr_probability
+        parts, spans, pos, prev_end = [], [], 0, 0
+        for tok, (start, end) in zip(tokens, self.spans):
+            gap = self.text[prev_end:start]
+            parts += (gap, tok)
+            pos += len(gap)
+            spans.append((pos, pos + len(tok)))
+            pos += len(tok)
+            prev_end = end
+        parts.append(self.text[prev_end:])
+        new.text = "".join(parts)
+        new._set_tokens(list(tokens), spans, self.is_word)
+        return new
 
 def get_user_input(active_language):
-    """Get user input: typed (live-colored) or spoken."""
+    """
+    Get user input: typed (live-colored) or spoken.
+    Returns a Turn (spoken turns carry Whisper's language detection), or None.
+    """
     first = get_single_key()
 
     # Speech input
     if first == " ":
-        audio = record_while_holding_space(already_pressed=True)
+        detector = StreamingLanguageDetector().start() if ASR_STREAMING_DETECT else None
+        audio = record_while_holding_space(already_pressed=True,
+                                           on_block=detector.feed if detector else None)
+        early_lang, early_prob = detector.stop() if detector else (None, 0.0)
         if audio.size == 0:
             print("(no speech captured; hold SPACE to talk)")
             return None
-        lang_code = "sv" if active_language == "sv" else "en"
-        raw = transcribe_audio_whisper(audio, lang_code).strip()
+        lang_code = language_pack(active_language).code
+        if early_lang:
+            # decided (and warmed up) while the user was still talking
+            raw, asr_lang, asr_prob = transcribe_audio_whisper(audio, early_lang), early_lang, early_prob
+        elif ASR_DETECT_LANGUAGE:
+            raw, asr_lang, asr_prob = transcribe_audio_detect(audio, lang_code)
+        else:
+            raw, asr_lang, asr_prob = transcribe_audio_whisper(audio, lang_code), None, 0.0
+        raw = raw.strip()
         if not raw:
             print("(didn't catch that)")
             return None
         print(f"{Fore.GREEN}USER: {format_sentence(raw)}{Style.RESET_ALL}")
-        return raw, raw.lower()
+        return Turn(raw, asr_lang, asr_prob)
 
     # Typed input with live color
     raw = colored_input("USER: ", first_char=first, color=Fore.GREEN).strip()
     if not raw:
         return None
-    return raw, raw.lower()
+    return Turn(raw)
 
 # ---------------------------------------------------------
 # Main program loop
 # ---------------------------------------------------------
 def main():
     session_number = 1
-    tts_prepare(en_voice="Zira", sv_voice="Bengt")  # Pick voices
+    tts_prepare()  # preferred voices come from the packs' tts_voice; override per code here
+    for code in available_languages():
+        _resolve_voice_id(code)  # on the main thread: some TTS drivers need it
 
     # GPU check for Whisper
     torch_spec = importlib.util.find_spec("torch")
@@ -1116,8 +2095,9 @@ def main():
 
 # Smaller = faster but less accurate.
 # Larger = slower but more accurate.
-    active_language = "en"
+    active_language = DEFAULT_LANGUAGE
     eliza_bot = Eliza(language=active_language)
+    watch_rule_scripts()  # edit languages/<code>/rules.json while ELIZA runs
 
     while True:
 # Clear any setup output before showing user prompts
@@ -1140,70 +2120,35 @@ def main():
     
         print(f"--- Session {session_number} ---")
         session_number += 1
-        active_language = "en"
+        active_language = DEFAULT_LANGUAGE
         eliza_bot = Eliza(language=active_language)
+        language_tracker = LanguageTracker(active_language)
 
         while True:
-            user_data = get_user_input(active_language)
-            if user_data is None:
+            turn = get_user_input(active_language)
+            if turn is None:
                 continue
-            user_text_raw, user_text = user_data  # user_text already lower-cased
 
-            # 1) normalize slang/contractions first (if you added normalize_input)
-            try:
-                user_text = normalize_input(user_text)
-            except NameError:
-                pass  # ok if you haven't defined normalize_input
+            # 1) pick language once (commands, then Whisper, then text cues; switches need a clear lead)
+            lang_hint = language_tracker.update(turn.text, turn.asr_language, turn.asr_probability, turn.words)
 
-            # 2) pick language once (prefer strong cues, else sticky)
-            lang_hint = detect_language_strong(user_text) or active_language
+            # 2) tag code-switched parts; each is spell-checked in its own language
+            segments = language_segments(turn, lang_hint)
+            turn = correct_turn(turn, lang_hint, segments)
+            user_text = turn.text
 
-            # 3) run exactly one spell path
-            if lang_hint == "sv":
-                user_text = correct_swedish_text(user_text)
-            else:
-                # pyspellchecker (token-wise to keep punctuation)
-                tokens = re.findall(r"\w+|[^\w\s]", user_text, flags=re.UNICODE)
-                words = [t for t in tokens if re.match(r"^\w+$", t, flags=re.UNICODE)]
-                unknown = spell_en.unknown(words)
-                fixed = []
-                wi = 0
-                for t in tokens:
-                    if re.match(r"^\w+$", t, flags=re.UNICODE):
-                        w = t
-                        fixed_word = spell_en.correction(w) if w in unknown else w
-                        fixed.append(fixed_word)
-                        wi += 1
-                    else:
-                        fixed.append(t)
-                # rejoin with spacing
-                user_text = "".join(
-                    ((" " if i and fixed[i-1].isalnum() and tok.isalnum() else "") + tok)
-                    for i, tok in enumerate(fixed)
-                )
-
-            # 4) lock language if it changed
+            # 3) lock language if it changed
             if lang_hint != active_language:
                 active_language = lang_hint
                 eliza_bot.language = active_language
 
-            # Exit check (supports single words and multi-word phrases)
-            text_lc = user_text
-            words = re.findall(r"\b[\wåäö]+\b", text_lc)
-            if any(w in QUIT_WORDS for w in words):
-                should_quit = True
-            else:
-                MULTI_QUITS = {
-                    "see you", "see ya", "catch you later", "so long",
-                    "good bye", "bye bye",
-                    "vi ses", "ha det", "ha det bra", "ta hand om dig",
-                    "på återseende", "sköt om dig", "slut på samtal"
-                }
-                should_quit = any(p in text_lc for p in MULTI_QUITS)
+            # Exit check: a goodbye in any language (single words and multi-word phrases)
+            packs = [language_pack(code) for code in available_languages()]
+            should_quit = any(w in pack.goodbye_words for pack in packs for w in turn.folded) or \
+                any(p in fold(user_text) for pack in packs for p in pack.goodbye_phrases)
 
             if should_quit:
-                farewells = FAREWELLS_SV if active_language == "sv" else FAREWELLS_EN
-                farewell = format_sentence(random.choice(farewells))
+                farewell = format_sentence(random.choice(language_pack(active_language).farewells))
                 print(f"{Fore.CYAN}ELIZA: {farewell}{Style.RESET_ALL}")
                 speak(farewell, lang=active_language)
                 time.sleep(2)
@@ -1211,7 +2156,7 @@ def main():
                 break
 
             # Respond via ELIZA
-            reply = format_sentence(eliza_bot.respond(user_text))
+            reply = format_sentence(eliza_bot.respond_turn(turn, segments))
 
             # show typos/disfluencies for human feel
             shown_reply = humanize_text(
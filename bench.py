@@ -0,0 +1,291 @@
+"""
+bench.py
+Microbenchmarks for the text side of the ELIZA pipeline (no audio needed).
+
+Usage:
+    python bench.py            # run every benchmark
+    python bench.py rules      # run only the named benchmarks
+    python bench.py langid     # language detection accuracy + throughput
+    python bench.py spell      # spelling correction, per word vs indexed vs batched
+"""
+
+import sys
+import time
+
+import Eliza_Complicated as ez
+
+SAMPLES_EN = [
+    "I need a long vacation somewhere warm",
+    "why don't you ever listen to me?",
+    "I am tired of everything at work",
+    "my mother never calls me anymore",
+    "I think my friend is angry with me",
+    "the computer keeps crashing when I save",
+    "it is raining again and I hate it",
+    "well I just wanted to say something nice today",
+    "do you think it will get better?",
+    "nothing much happened this weekend",
+]
+
+SAMPLES_SV = [
+    "jag behöver en lång semester",
+    "varför gör du inte som jag säger?",
+    "jag är så trött på allt just nu",
+    "min mamma ringer aldrig längre",
+    "jag tror att min vän är arg på mig",
+    "min dator kraschar hela tiden",
+    "det är kallt ute och jag fryser",
+    "inget särskilt hände i helgen",
+    "tror du att det blir bättre?",
+    "vi åkte till stugan med barnen",
+]
+
+
+def _per_call(fn, inputs, min_time=0.5):
+    """Run fn over inputs until min_time has passed; return seconds per call."""
+    calls, start = 0, time.perf_counter()
+    while True:
+        for text in inputs:
+            fn(text)
+        calls += len(inputs)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def _report(name, seconds, baseline=None):
+    line = f"  {name:<28} {seconds * 1e6:9.2f} us/call"
+    if baseline:
+        line += f"   ({baseline / seconds:4.1f}x)"
+    print(line)
+
+
+def bench_rules():
+    """Plain top-to-bottom regex scan vs keyword index vs fused single regex."""
+    for lang, rules, samples in (("en", ez.rules_for("en"), SAMPLES_EN),
+                                 ("sv", ez.rules_for("sv"), SAMPLES_SV)):
+        def sequential(text):
+            for i, (regex, _replies) in enumerate(rules.rules):
+                match = regex.search(text)
+                if match:
+                    return i, match.groups()
+            return None
+
+        print(f"[rules/{lang}]")
+        base = _per_call(sequential, samples)
+        _report("sequential scan", base)
+        _report("keyword index", _per_call(rules.search, samples), base)
+        _report("fused regex", _per_call(rules.fused_search, samples), base)
+
+
+def bench_paste():
+    """Worst-case style input: a 200 KB pasted log with no rule keywords."""
+    paste = "2024-01-01 12:00:00 worker blah blah status nominal\n" * 4000
+    rules = ez.rules_for("en")
+    print(f"[paste/{len(paste) // 1024} KB]")
+    for name, fn in (("keyword index", rules.search),
+                     ("fused regex", rules.fused_search),
+                     ("Eliza.respond (capped)", ez.Eliza().respond)):
+        _report(name, _per_call(fn, [paste], min_time=0.2))
+
+
+def bench_reflect():
+    """Per-fragment pronoun reflection: word split + dict lookups vs one regex pass."""
+    import re
+    word_re = re.compile(r"\b[\wåäöÅÄÖ']+\b")
+
+    rules = ez.rules_for("en")
+
+    def split_and_lookup(fragment):  # the original reflect_text
+        return " ".join(rules.reflections.get(w, w) for w in word_re.findall(fragment.lower()))
+
+    fragments = [g for m in map(rules.search, SAMPLES_EN) if m for g in m[1] if g]
+    print(f"[reflect/{len(fragments)} fragments]")
+    base = _per_call(split_and_lookup, fragments)
+    _report("split + dict lookup", base)
+    _report("one-pass regex", _per_call(rules.reflect, fragments), base)
+
+
+def bench_templates():
+    """Filling every reply in both tables: str.format per turn vs pre-split templates."""
+    templates = [t for rules in map(ez.rules_for, ("en", "sv")) for _, replies in rules for t in replies]
+    fills = ["your mother to call you more often"]
+    print(f"[templates/{len(templates)} replies]")
+    base = _per_call(lambda t: t.text.format(*fills), templates)
+    _report("str.format", base)
+    _report("ReplyTemplate.fill", _per_call(lambda t: t.fill(fills), templates), base)
+
+    # whole reply step: the old code reflected every capture before formatting
+    import random
+    bot = ez.Eliza()
+    rules = ez.rules_for("en")
+
+    def reflect_then_format(text):
+        index, groups = rules.search(text)
+        template = random.choice(rules[index][1])
+        return template.text.format(*[bot.reflect_text(g) for g in groups if g is not None])
+
+    print("[templates/reply step]")
+    base = _per_call(reflect_then_format, SAMPLES_EN)
+    _report("reflect all + format", base)
+    _report("Eliza.respond", _per_call(bot.respond, SAMPLES_EN), base)
+
+
+def bench_replay():
+    """Replaying a scripted conversation: normal mode vs deterministic (cached) mode."""
+    print("[replay/en]")
+    base = _per_call(ez.Eliza().respond, SAMPLES_EN)
+    _report("random, uncached", base)
+    _report("seeded + reply cache", _per_call(ez.Eliza(seed=1).respond, SAMPLES_EN), base)
+    print(f"  {ez.Eliza.cache_info()}")
+
+
+def bench_batch():
+    """20k corpus lines: respond() in a loop vs respond_batch (in-process and pooled)."""
+    import os
+    corpus = [f"{text} {i % 50}" for i, text in enumerate(SAMPLES_EN * 2000)]
+    bot = ez.Eliza()
+    runs = [("respond() loop", lambda: [bot.respond(t) for t in corpus]),
+            ("respond_batch", lambda: list(bot.respond_batch(corpus)))]
+    workers = os.cpu_count() or 1
+    if workers > 1:
+        runs.append((f"respond_batch x{workers} procs",
+                     lambda: list(bot.respond_batch(corpus, processes=workers, chunksize=2000))))
+    print(f"[batch/{len(corpus)} lines]")
+    base = None
+    for name, run in runs:
+        start = time.perf_counter()
+        run()
+        per_line = (time.perf_counter() - start) / len(corpus)
+        _report(name, per_line, base)
+        base = base or per_line
+
+
+def _typo_lines(samples, lang, copies=50):
+    """Typo-laden copies of samples (stable across runs)."""
+    import random
+    rng_state = random.getstate()
+    random.seed(21)  # humanize_text uses the global RNG
+    try:
+        return [ez.humanize_text(text, lang=lang, typo_prob=1.0, max_typos=2, filler_prob=0.0, style_prob=0.0)
+                for text in samples * copies]
+    finally:
+        random.setstate(rng_state)
+
+
+def bench_spell():
+    """Spelling correction: pyspellchecker vs the SymSpell index (en), per turn vs batched (sv), cache."""
+    ez.configure_spell_cache(0)  # uncached first
+    pyspell, symspell = ez.english_spellchecker(), ez.english_symspell()  # load outside the timing
+    lines = _typo_lines(SAMPLES_EN, "en")
+    words = sorted({w for text in lines for w in pyspell.unknown(ez.Turn(text).words)})
+    print(f"[spell/en {len(words)} unknown words from {len(lines)} lines]")
+    base = _per_call(pyspell.correction, words, min_time=0.3)
+    _report("pyspellchecker", base)
+    _report("SymSpell index", _per_call(symspell.correction, words), base)
+    _report("SymSpell, batched", _per_call(lambda _: symspell.corrections(words), [None]) / len(words), base)
+
+    sv_lines = _typo_lines(SAMPLES_SV, "sv")
+    print(f"[spell/sv {len(sv_lines)} lines, {len(ez.swedish_vocab())} vocab words]")
+    ez.swedish_symspell()
+    sv_base = _per_call(ez.correct_swedish_text, sv_lines)
+    _report("correct_swedish_text", sv_base)
+    _report("correct_swedish_batch", _per_call(lambda _: list(ez.correct_swedish_batch(sv_lines)), [None])
+            / len(sv_lines), sv_base)
+
+    ez.configure_spell_cache()
+    print("[spell/cached]")
+    _report("en, SymSpell + cache", _per_call(lambda w: ez.cached_correction("en", w, symspell.correction), words), base)
+    _report("sv, per turn + cache", _per_call(ez.correct_swedish_text, sv_lines), sv_base)
+    print(f"  {ez.spell_cache_info()}")
+
+
+def _load_langid_corpus():
+    """(label, text) pairs from the bundled set, plus a typo-laden copy of each en/sv line."""
+    import os
+    import random
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "languages", "langid_eval.tsv")
+    with open(path, encoding="utf-8") as f:
+        rows = [line.rstrip("\n").split("\t", 1) for line in f if line.strip() and not line.startswith("#")]
+    rng_state = random.getstate()
+    random.seed(16)  # humanize_text uses the global RNG; keep the corpus stable
+    try:
+        typos = [(label, ez.humanize_text(text, lang=label, typo_prob=1.0, max_typos=2,
+                                          filler_prob=0.0, style_prob=0.0))
+                 for label, text in rows if label in ("en", "sv")]
+    finally:
+        random.setstate(rng_state)
+    return [(label, text.lower()) for label, text in rows + typos]
+
+
+def _first_hit_regexes(text):  # the original detector: one regex per keyword, Swedish first
+    import re
+    sv, en = ez.language_pack("sv"), ez.language_pack("en")
+    if any(ch in text for ch in "åäö") or any(re.search(rf"\b{w}\b", text) for w in sv.recognition):
+        return "sv"
+    if any(re.search(rf"\b{w}\b", text) for w in en.recognition):
+        return "en"
+    return None
+
+
+def _trigram_only(text):
+    probs = ez.trigram_language_probs(text)
+    return max(probs, key=probs.get) if probs else None
+
+
+def _keywords_only(text):
+    return ez.leading_language(ez.language_scores(text))
+
+
+LANGID_DETECTORS = {
+    "first-hit regexes (old)": _first_hit_regexes,
+    "detect_language_strong": ez.detect_language_strong,
+    "keyword scores": _keywords_only,
+    "trigram model": _trigram_only,
+}
+
+
+def bench_langid():
+    """Accuracy, confusion matrix and throughput of each language detector on the labelled corpus."""
+    corpus = _load_langid_corpus()
+    labels = sorted({label for label, _ in corpus})
+    outputs = list(ez.available_languages()) + [None]
+    print(f"[langid/{len(corpus)} utterances: "
+          + ", ".join(f"{sum(1 for l, _ in corpus if l == label)} {label}" for label in labels) + "]")
+    for name, detect in LANGID_DETECTORS.items():
+        guesses = [detect(text) for _, text in corpus]
+        scored = [(label, guess) for (label, _), guess in zip(corpus, guesses) if label != "mixed"]
+        correct = sum(1 for label, guess in scored if label == guess)
+        per_call = _per_call(detect, [text for _, text in corpus], min_time=0.3)
+        print(f"  {name:<28} accuracy {correct / len(scored):6.1%}   {1 / per_call:10,.0f} utt/s/core")
+        print("      truth \\ guess " + "".join(f"{str(o):>7}" for o in outputs))
+        for label in labels:
+            row = [sum(1 for (l, _), g in zip(corpus, guesses) if l == label and g == o) for o in outputs]
+            print(f"      {label:<13}" + "".join(f"{n:>7}" for n in row))
+
+
+BENCHMARKS = {
+    "rules": bench_rules,
+    "paste": bench_paste,
+    "reflect": bench_reflect,
+    "templates": bench_templates,
+    "replay": bench_replay,
+    "batch": bench_batch,
+    "langid": bench_langid,
+    "spell": bench_spell,
+}
+
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}. Choose from: {', '.join(BENCHMARKS)}")
+        return 2
+    for name in names:
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))